@@ -0,0 +1,614 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import contextlib
+import os
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import sharc
+import sharc.batch
+import sharc.cache
+import sharc.columns
+
+try:
+    from PyQt5 import QtCore, QtGui
+    import highlighter
+
+except ImportError:
+    highlighter = None
+
+
+def makeArchive(programCount=10000, sourceCount=64):
+    archive = sharc.Archive('benchmark')
+
+    codeList = archive.codeList
+    for i in range(sourceCount):
+        code = sharc.ShaderSource()
+        code.name = 'source%d.glsl' % i
+        code.code = 'uniform vec4 color;\nvoid main() { gl_FragColor = color; }\n' * 32
+        codeList.append(code)
+
+    progList = archive.progList
+    for i in range(programCount):
+        program = sharc.ShaderProgram()
+        program.name = 'program%d' % i
+        program.vtxShIdx = i % sourceCount
+        program.frgShIdx = (i + 1) % sourceCount
+
+        for j in range(4):
+            macro = sharc.ShaderMacro()
+            macro.name = 'MACRO_%d' % j
+            macro.value = str(j)
+            program.vertexMacros.append(macro)
+            program.fragmentMacros.append(macro)
+
+        for j in range(2):
+            variation = sharc.ShaderVariation()
+            variation.name = 'variation%d' % j
+            variation.ID = 'VARIATION_%d' % j
+            variation.values = ['0', '1', '2']
+            program.variations.append(variation)
+
+            default = sharc.ShaderVariation()
+            default.name = variation.name
+            default.ID = variation.ID
+            default.values = ['0']
+            program.variationDefaults.append(default)
+
+        for j in range(4):
+            sym = sharc.ShaderSymbol()
+            sym.name = 'uniform%d' % j
+            sym.ID = 'u%d' % j
+            sym.param = j * 16
+            sym.defaultValue = bytes(16)
+            sym.validVariations = [True]
+            program.uniformVariables.append(sym)
+
+        sym = sharc.ShaderSymbol()
+        sym.name = 'block'
+        sym.ID = 'b'
+        sym.defaultValue = bytes(64)
+        sym.param = len(sym.defaultValue)
+        sym.validVariations = [True]
+        program.uniformBlocks.append(sym)
+
+        for symList in (program.samplerVariables, program.attribVariables):
+            sym = sharc.ShaderSymbol()
+            sym.name = 'sym'
+            sym.ID = 's'
+            sym.param = -1
+            sym.validVariations = [True]
+            symList.append(sym)
+
+        progList.append(program)
+
+    return bytes(archive.save())
+
+
+def timeit(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+
+def benchCodec(count=200000):
+    data = bytes(24) * 2
+    sym = sharc.ShaderSymbol()
+
+    def formatString():
+        for _ in range(count):
+            struct.unpack_from('%s%s' % (sym.endianness, sym.format), data, 0)
+            struct.calcsize(sym.format)
+
+    def cached():
+        for _ in range(count):
+            codec = sym.codecs[sym.endianness]
+            codec.unpack_from(data, 0)
+            codec.size
+
+    old = timeit(formatString)
+    new = timeit(cached)
+    print("codec: format string %.3fs, cached Struct %.3fs (%.2fx) for %d records" % (old, new, old / new, count))
+
+
+def loadValuesBytewise(data, pos, valueCount):
+    # The per-byte scan ShaderVariation.load used before, for comparison
+    values = []
+    for _ in range(valueCount):
+        while data[pos] == 0:
+            pos += 1
+
+        start_pos = pos
+        pos += 1
+
+        while data[pos] != 0:
+            pos += 1
+
+        pos += 1
+
+        values.append(data[start_pos:pos].decode('utf-8').rstrip('\0'))
+
+    return values
+
+
+def benchVariation(valueCount=5000, repeat=20):
+    variation = sharc.ShaderVariation()
+    variation.name = 'variation'
+    variation.ID = 'VARIATION'
+    variation.values = ['value%d' % i for i in range(valueCount)]
+    data = variation.save()
+
+    pos = sharc.ShaderVariation.codecs['<'].size + len(variation.name) + 1
+
+    def bytewise():
+        for _ in range(repeat):
+            loadValuesBytewise(data, pos, valueCount)
+
+    def split():
+        for _ in range(repeat):
+            sharc.ShaderVariation().load(data, 0)
+
+    old = timeit(bytewise)
+    new = timeit(split)
+    print("variation: bytewise %.3fs, split %.3fs (%.2fx) for %d x %d values" % (old, new, old / new, repeat, valueCount))
+
+
+class FormatStringCodec:
+    """Struct look-alike going through the struct module functions"""
+
+    def __init__(self, format):
+        self.format = format
+
+    @property
+    def size(self):
+        return struct.calcsize(self.format)
+
+    def unpack_from(self, data, pos=0):
+        return struct.unpack_from(self.format, data, pos)
+
+    def pack(self, *values):
+        return struct.pack(self.format, *values)
+
+    def pack_into(self, buffer, pos, *values):
+        struct.pack_into(self.format, buffer, pos, *values)
+
+
+class FormatStringCodecs(sharc.Codec):
+    # Nothing is kept, every lookup formats the string again like sharc
+    # did before Codec
+    def __missing__(self, endianness):
+        return FormatStringCodec(endianness + self.format)
+
+
+@contextlib.contextmanager
+def formatStringCodecs():
+    """Make every record class use FormatStringCodecs for a while"""
+    codecs = {cls: cls.codecs for cls in vars(sharc).values() if isinstance(cls, type) and 'codecs' in vars(cls)}
+    for cls in codecs:
+        cls.codecs = FormatStringCodecs(cls.format)
+
+    try:
+        yield
+
+    finally:
+        for cls, classCodecs in codecs.items():
+            cls.codecs = classCodecs
+
+
+def benchArchive(programCount=10000):
+    inb = makeArchive(programCount)
+    size = len(inb) / (1024 * 1024)
+
+    def run():
+        result = []
+        loadTime = timeit(lambda: result.append(sharc.load(inb)))
+        archive = result[-1]
+
+        # Re-encode every program rather than copying the loaded bytes
+        for program in archive.progList:
+            program.dirty = True
+
+        saveTime = timeit(archive.save)
+
+        assert archive.save() == inb
+        return loadTime, saveTime
+
+    with formatStringCodecs():
+        oldLoadTime, oldSaveTime = run()
+
+    loadTime, saveTime = run()
+
+    print("archive: %d programs, %.2f MB" % (programCount, size))
+    print("  load: format string %.3fs (%.2f MB/s), cached Struct %.3fs (%.2f MB/s), %.2fx" %
+          (oldLoadTime, size / oldLoadTime, loadTime, size / loadTime, oldLoadTime / loadTime))
+    print("  save: format string %.3fs (%.2f MB/s), cached Struct %.3fs (%.2f MB/s), %.2fx" %
+          (oldSaveTime, size / oldSaveTime, saveTime, size / saveTime, oldSaveTime / saveTime))
+
+
+def savePreallocated(archive):
+    # Sizes first, then every record packed in place into one buffer, like
+    # writeInto() does; sharc.save used this for a while
+    fileSize = archive.calcSize()
+    outBuffer = bytearray(fileSize)
+
+    pos = archive.header.saveInto(outBuffer, 0, fileSize)
+    pos = archive.progList.saveInto(outBuffer, pos)
+    archive.codeList.saveInto(outBuffer, pos)
+
+    return outBuffer
+
+
+def writeInto(archive):
+    with open(os.devnull, 'wb') as out:
+        archive.writeInto(out)
+
+
+def peakMemory(func, *args):
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return peak / (1024 * 1024)
+
+
+def benchSave(programCount=10000):
+    archive = sharc.load(makeArchive(programCount))
+
+    # Re-encode every program rather than copying the loaded bytes
+    for program in archive.progList:
+        program.dirty = True
+
+    assert savePreallocated(archive) == sharc.save(archive)
+
+    print("save: %d programs" % programCount)
+    for name, func in (("save", sharc.save), ("preallocated", savePreallocated), ("write_into", writeInto)):
+        elapsed = timeit(lambda: func(archive))
+        print("  %-12s %.3fs, peak %.2f MB" % (name, elapsed, peakMemory(func, archive)))
+
+
+def benchIncrementalSave(programCount=10000):
+    inb = makeArchive(programCount)
+
+    print("incremental save: one macro changed in %d programs" % programCount)
+    for lazy in (False, True):
+        archive = sharc.load(inb, lazy=lazy)
+        archive.progList[programCount // 2].vertexMacros[0].value = 'changed'
+
+        elapsed = timeit(archive.save)
+        print("  %-12s %.3fs" % ("lazy" if lazy else "eager", elapsed))
+
+
+def convertReencode(archive, endianness):
+    # Rebuild every record in the other byte order, for comparison
+    converted = sharc.load(archive.save())
+    for itemList in (converted.progList, converted.codeList):
+        itemList.endianness = endianness
+
+    converted.header.endianness = endianness
+    for program in converted.progList:
+        program.endianness = endianness
+        program.dirty = True
+        for itemList in program.getLists():
+            itemList.endianness = endianness
+            for item in itemList:
+                item.endianness = endianness
+
+    for code in converted.codeList:
+        code.endianness = endianness
+
+    return converted.save()
+
+
+def benchConvert(programCount=10000):
+    archive = sharc.load(makeArchive(programCount), lazy=True)
+    assert convertReencode(archive, '>') == archive.save('>')
+
+    print("convert to big-endian: %d programs" % programCount)
+    for name, func in (("re-encode", lambda: convertReencode(archive, '>')), ("swap", lambda: archive.save('>'))):
+        print("  %-12s %.3fs" % (name, timeit(func)))
+
+
+class DictSymbol:
+    # ShaderSymbol as it was before __slots__: a __dict__ per instance, the
+    # format string stored on each one and the flags as a list of bools
+    def __init__(self, endianness='<'):
+        self.format = 'Ii4I'
+        self.endianness = endianness
+
+        self.size = 0
+
+        self.param = 0
+        self.name = ''
+        self.ID = ''
+        self.defaultValue = b''
+        self.validVariations = []
+
+    def load(self, data, pos):
+        (self.size,
+         self.param,
+         nameLen,
+         idLen,
+         defaultValueLen,
+         variationCount) = struct.unpack_from('%s%s' % (self.endianness, self.format), data, pos)
+        assert self.size >= struct.calcsize(self.format)
+        pos += struct.calcsize(self.format)
+
+        self.name = data[pos:pos + nameLen].decode('utf-8').rstrip('\0')
+        pos += nameLen
+
+        self.ID = data[pos:pos + idLen].decode('utf-8').rstrip('\0')
+        pos += idLen
+
+        self.defaultValue = data[pos:pos + defaultValueLen]
+        pos += defaultValueLen
+
+        self.validVariations = list(map(bool, data[pos:pos + variationCount]))
+
+
+def benchRecordMemory(symbolCount=100000):
+    symbols = sharc.List()
+    for i in range(symbolCount):
+        sym = sharc.ShaderSymbol()
+        sym.name = 'uniform%d' % i
+        sym.ID = 'u%d' % i
+        sym.defaultValue = bytes(16)
+        sym.validVariations = [True] * 4
+        symbols.append(sym)
+
+    data = symbols.save()
+
+    print("records: %d symbols" % symbolCount)
+    for name, ItemClass in (("dict", DictSymbol), ("slots", sharc.ShaderSymbol)):
+        tracemalloc.start()
+        loaded = sharc.List()
+        loaded.load(data, 0, ItemClass)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        print("  %-12s %.2f MB (%d bytes per symbol)" % (name, size / (1024 * 1024), size // symbolCount))
+        del loaded
+
+
+def benchInterning(archiveCount=4, programCount=2000):
+    inb = makeArchive(programCount)
+
+    def loadAll(interner):
+        return [sharc.load(inb, interner=interner) for _ in range(archiveCount)]
+
+    print("interning: %d archives of %d programs" % (archiveCount, programCount))
+    for name, interner in (("plain", lambda: None), ("interned", sharc.Interner)):
+        tracemalloc.start()
+        archives = loadAll(interner())
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        print("  %-12s %.2f MB" % (name, size / (1024 * 1024)))
+        del archives
+
+
+def benchDefaultValue(size=64 * 1024):
+    sym = sharc.ShaderSymbol()
+    sym.setDefaultArray([i * 0.25 for i in range(size // 4)])
+    data = sym.defaultValue
+
+    def literal():
+        sym.defaultValue = eval(str(data))
+
+    def typed():
+        sym.defaultValueText = sym.defaultValueText
+
+    def typedArray():
+        sym.setDefaultArray(sym.getDefaultArray())
+
+    typed()
+    assert sym.defaultValue == data
+
+    typedArray()
+    assert sym.defaultValue == data
+
+    print("default value: %d KB round trip" % (size // 1024))
+    print("  %-12s %.4fs" % ("eval", timeit(literal)))
+    print("  %-12s %.4fs (text)" % ("typed", timeit(typed)))
+    print("  %-12s %.4fs" % ("array", timeit(typedArray)))
+
+
+def benchSymbolTable(programCount=10000):
+    archive = sharc.load(makeArchive(programCount), lazy=True)
+    SymbolTable = sharc.columns.SymbolTable
+
+    def walk():
+        return [program.name for program in archive.progList if 'block' in program.uniformBlocks]
+
+    result = []
+    buildTime = timeit(lambda: result.append(SymbolTable.fromArchive(archive)), repeat=1)
+    table = result[-1]
+
+    walkTime = timeit(walk, repeat=1)
+    queryTime = timeit(lambda: table.findPrograms('block', SymbolTable.UNIFORM_BLOCK))
+    assert walk() == table.findPrograms('block', SymbolTable.UNIFORM_BLOCK)
+
+    print("symbol table: %d symbols in %d programs" % (len(table), programCount))
+    print("  build %.3fs" % buildTime)
+    print("  programs using a uniform block: objects %.3fs (first access), columns %.3fs" % (walkTime, queryTime))
+
+
+def benchCache(programCount=10000):
+    inb = makeArchive(programCount)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'benchmark.sharc')
+        with open(path, 'wb') as out:
+            out.write(inb)
+
+        cache = sharc.cache.Cache(os.path.join(tmp, 'cache'))
+        coldTime = timeit(lambda: sharc.load_path(path))
+        cache.load(path)
+        warmTime = timeit(lambda: cache.load(path))
+
+    print("cache: %d programs, %.2f MB" % (programCount, len(inb) / (1024 * 1024)))
+    print("  parse %.4fs, cached index %.4fs" % (coldTime, warmTime))
+
+
+def countSymbols(path, archive):
+    return sum([len(program.uniformVariables) for program in archive.progList])
+
+
+def benchBatch(archiveCount=16, programCount=1000):
+    inb = makeArchive(programCount)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(archiveCount):
+            path = os.path.join(tmp, '%d.sharc' % i)
+            with open(path, 'wb') as out:
+                out.write(inb)
+
+            paths.append(path)
+
+        print("batch: %d archives of %d programs" % (archiveCount, programCount))
+        for workers in sorted({1, os.cpu_count() or 1}):
+            elapsed = timeit(lambda: sharc.batch.process(paths, countSymbols, workers=workers, lazy=False), repeat=1)
+            print("  %d workers %.3fs (%.1f archives/s)" % (workers, elapsed, archiveCount / elapsed))
+
+
+# The per-pattern rules the highlighter used before, for comparison
+rulePatterns = [
+    r'\bchar\b', r'\bclass\b', r'\bconst\b',
+    r'\bdouble\b', r'\benum\b', r'\bexplicit\b',
+    r'\bfriend\b', r'\binline\b', r'\bint\b',
+    r'\blong\b', r'\bnamespace\b', r'\boperator\b',
+    r'\bprivate\b', r'\bprotected\b', r'\bpublic\b',
+    r'\bshort\b', r'\bsignals\b', r'\bsigned\b',
+    r'\bslots\b', r'\bstatic\b', r'\bstruct\b',
+    r'\btemplate\b', r'\btypedef\b', r'\btypename\b',
+    r'\bunion\b', r'\bunsigned\b', r'\bvirtual\b',
+    r'\bvoid\b', r'\bvolatile\b', r'\bbool\b',
+    r'\bfloat\b', r'\blong\b', r'\bivec4\b',
+    r'\bvec2\b', r'\bvec3\b', r'\bvec4\b',
+    r'\buniform\b', r'\bin\b', r'\bout\b',
+    r'\bQ[A-Za-z]+\b', '".*"', r'\b[A-Za-z0-9_]+(?=\()', '//[^\n]*',
+]
+
+
+def makeRuleHighlighter():
+    class RuleHighlighter(highlighter.Highlighter):
+        def __init__(self, parent=None):
+            super().__init__(parent)
+
+            self.highlightingRules = [(QtCore.QRegularExpression(pattern), self.keywordFormat) for pattern in rulePatterns]
+            self.commentStartExpression = QtCore.QRegExp(r'/\*')
+            self.commentEndExpression = QtCore.QRegularExpression(r'\*/')
+
+        def highlightBlock(self, text):
+            for pattern, format in self.highlightingRules:
+                matchIterator = pattern.globalMatch(text)
+                while matchIterator.hasNext():
+                    match = matchIterator.next()
+                    self.setFormat(match.capturedStart(), match.capturedLength(), format)
+
+            self.setCurrentBlockState(0)
+            startIndex = 0
+            if self.previousBlockState() != 1:
+                startIndex = self.commentStartExpression.indexIn(text)
+
+            while startIndex >= 0:
+                match = self.commentEndExpression.match(text, startIndex)
+                endIndex = match.capturedStart()
+                commentLength = 0
+                if endIndex == -1:
+                    self.setCurrentBlockState(1)
+                    commentLength = len(text) - startIndex
+
+                else:
+                    commentLength = endIndex - startIndex + match.capturedLength()
+
+                self.setFormat(startIndex, commentLength, self.multiLineCommentFormat)
+                startIndex = self.commentStartExpression.indexIn(text, startIndex + commentLength)
+
+    return RuleHighlighter
+
+
+def makeShader(lineCount=50000):
+    lines = [
+        '#version 330 core',
+        '/* Lighting',
+        '   for the benchmark */',
+        'uniform sampler2D diffuse; // base color',
+        'in vec2 uv;',
+        'out vec4 fragColor;',
+        'void main() {',
+        '    vec3 n = normalize(gl_FrontFacing ? normal : -normal);',
+        '    float light = clamp(dot(n, vec3(0.5, 1.0, 0.25)), 0.0, 1.0) * 0.8f;',
+        '    fragColor = vec4(texture(diffuse, uv).rgb * light, 1.0);',
+        '}',
+    ]
+
+    return '\n'.join([lines[i % len(lines)] for i in range(lineCount)])
+
+
+def highlightAll(syntaxHighlighter):
+    # Run the chunks the highlighter leaves to its timer right away
+    syntaxHighlighter.rehighlight()
+    while syntaxHighlighter.timer.isActive():
+        syntaxHighlighter.timer.stop()
+        syntaxHighlighter.highlightPending()
+
+
+def benchHighlighter(lineCount=50000):
+    if highlighter is None:
+        print("highlighter: skipped, PyQt5 is not installed")
+        return
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    app = QtGui.QGuiApplication.instance() or QtGui.QGuiApplication(sys.argv[:1])
+
+    text = makeShader(lineCount)
+
+    print("highlighter: %d lines" % lineCount)
+    for name, HighlighterClass in (("rules", makeRuleHighlighter()), ("single pass", highlighter.Highlighter)):
+        document = QtGui.QTextDocument()
+        document.setPlainText(text)
+        syntaxHighlighter = HighlighterClass(document)
+
+        # The first call is what blocks the UI, the rest runs in timer ticks
+        firstTime = timeit(syntaxHighlighter.rehighlight, repeat=1)
+
+        document.setPlainText(text)
+        elapsed = timeit(lambda: highlightAll(syntaxHighlighter), repeat=1)
+        syntaxHighlighter.setDocument(None)
+
+        print("  %-12s %.3fs (%d blocks/s), first call %.3fs" % (name, elapsed, document.blockCount() / elapsed, firstTime))
+
+    del app
+
+
+def main():
+    programCount = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    benchCodec()
+    benchVariation()
+    benchArchive(programCount)
+    benchSave(programCount)
+    benchIncrementalSave(programCount)
+    benchConvert(programCount)
+    benchRecordMemory()
+    benchInterning()
+    benchDefaultValue()
+    benchSymbolTable(programCount)
+    benchCache(programCount)
+    benchBatch()
+    benchHighlighter()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,85 +1,301 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import re
+
 from PyQt5 import QtCore, QtGui
 Qt = QtCore.Qt
 
 
-keywordPatterns = [
-    r'\bchar\b', r'\bclass\b', r'\bconst\b',
-    r'\bdouble\b', r'\benum\b', r'\bexplicit\b',
-    r'\bfriend\b', r'\binline\b', r'\bint\b',
-    r'\blong\b', r'\bnamespace\b', r'\boperator\b',
-    r'\bprivate\b', r'\bprotected\b', r'\bpublic\b',
-    r'\bshort\b', r'\bsignals\b', r'\bsigned\b',
-    r'\bslots\b', r'\bstatic\b', r'\bstruct\b',
-    r'\btemplate\b', r'\btypedef\b', r'\btypename\b',
-    r'\bunion\b', r'\bunsigned\b', r'\bvirtual\b',
-    r'\bvoid\b', r'\bvolatile\b', r'\bbool\b',
-    r'\bfloat\b', r'\blong\b', r'\bivec4\b',
-    r'\bvec2\b', r'\bvec3\b', r'\bvec4\b',
-    r'\buniform\b', r'\bin\b', r'\bout\b'
+keywords = frozenset([
+    'attribute', 'const', 'uniform', 'varying', 'buffer', 'shared',
+    'coherent', 'volatile', 'restrict', 'readonly', 'writeonly',
+    'layout', 'centroid', 'flat', 'smooth', 'noperspective', 'patch',
+    'sample', 'invariant', 'precise', 'in', 'out', 'inout', 'subroutine',
+    'lowp', 'mediump', 'highp', 'precision', 'struct',
+    'break', 'continue', 'do', 'for', 'while', 'switch', 'case',
+    'default', 'if', 'else', 'discard', 'return', 'true', 'false',
+])
+
+samplerShapes = [
+    '1D', '2D', '3D', 'Cube', '2DRect', '1DArray', '2DArray',
+    'CubeArray', 'Buffer', '2DMS', '2DMSArray',
 ]
 
+types = frozenset(
+    ['void', 'bool', 'int', 'uint', 'float', 'double', 'atomic_uint']
+    + [prefix + 'vec' + n for prefix in ('', 'b', 'i', 'u', 'd') for n in '234']
+    + [prefix + 'mat' + n for prefix in ('', 'd') for n in '234']
+    + [prefix + 'mat%sx%s' % (n, m) for prefix in ('', 'd') for n in '234' for m in '234']
+    + [prefix + kind + shape for prefix in ('', 'i', 'u') for kind in ('sampler', 'image') for shape in samplerShapes]
+    + ['sampler' + shape + 'Shadow' for shape in ('1D', '2D', 'Cube', '2DRect', '1DArray', '2DArray', 'CubeArray')]
+    + ['samplerExternalOES']
+)
+
+builtins = frozenset([
+    # Angle, trigonometry and exponential functions
+    'radians', 'degrees', 'sin', 'cos', 'tan', 'asin', 'acos', 'atan',
+    'sinh', 'cosh', 'tanh', 'asinh', 'acosh', 'atanh',
+    'pow', 'exp', 'log', 'exp2', 'log2', 'sqrt', 'inversesqrt',
+
+    # Common functions
+    'abs', 'sign', 'floor', 'trunc', 'round', 'roundEven', 'ceil', 'fract',
+    'mod', 'modf', 'min', 'max', 'clamp', 'mix', 'step', 'smoothstep',
+    'isnan', 'isinf', 'floatBitsToInt', 'floatBitsToUint', 'intBitsToFloat',
+    'uintBitsToFloat', 'fma', 'frexp', 'ldexp',
+    'packUnorm2x16', 'packSnorm2x16', 'packUnorm4x8', 'packSnorm4x8',
+    'unpackUnorm2x16', 'unpackSnorm2x16', 'unpackUnorm4x8', 'unpackSnorm4x8',
+    'packHalf2x16', 'unpackHalf2x16', 'packDouble2x32', 'unpackDouble2x32',
+
+    # Geometric, matrix and vector relational functions
+    'length', 'distance', 'dot', 'cross', 'normalize', 'faceforward',
+    'reflect', 'refract', 'matrixCompMult', 'outerProduct', 'transpose',
+    'determinant', 'inverse', 'lessThan', 'lessThanEqual', 'greaterThan',
+    'greaterThanEqual', 'equal', 'notEqual', 'any', 'all', 'not',
+
+    # Integer functions
+    'uaddCarry', 'usubBorrow', 'umulExtended', 'imulExtended',
+    'bitfieldExtract', 'bitfieldInsert', 'bitfieldReverse', 'bitCount',
+    'findLSB', 'findMSB',
+
+    # Texture functions
+    'textureSize', 'textureQueryLod', 'textureQueryLevels', 'textureSamples',
+    'texture', 'textureProj', 'textureLod', 'textureOffset', 'texelFetch',
+    'texelFetchOffset', 'textureProjOffset', 'textureLodOffset',
+    'textureProjLod', 'textureProjLodOffset', 'textureGrad',
+    'textureGradOffset', 'textureProjGrad', 'textureProjGradOffset',
+    'textureGather', 'textureGatherOffset', 'textureGatherOffsets',
+    'texture1D', 'texture1DProj', 'texture1DLod', 'texture1DProjLod',
+    'texture2D', 'texture2DProj', 'texture2DLod', 'texture2DProjLod',
+    'texture3D', 'texture3DProj', 'texture3DLod', 'texture3DProjLod',
+    'textureCube', 'textureCubeLod', 'shadow1D', 'shadow2D',
+    'shadow1DProj', 'shadow2DProj', 'shadow1DLod', 'shadow2DLod',
+    'shadow1DProjLod', 'shadow2DProjLod',
+
+    # Image and atomic functions
+    'imageSize', 'imageSamples', 'imageLoad', 'imageStore',
+    'imageAtomicAdd', 'imageAtomicMin', 'imageAtomicMax', 'imageAtomicAnd',
+    'imageAtomicOr', 'imageAtomicXor', 'imageAtomicExchange',
+    'imageAtomicCompSwap', 'atomicAdd', 'atomicMin', 'atomicMax',
+    'atomicAnd', 'atomicOr', 'atomicXor', 'atomicExchange', 'atomicCompSwap',
+    'atomicCounter', 'atomicCounterIncrement', 'atomicCounterDecrement',
+
+    # Fragment processing, geometry shader and synchronization functions
+    'dFdx', 'dFdy', 'dFdxFine', 'dFdyFine', 'dFdxCoarse', 'dFdyCoarse',
+    'fwidth', 'fwidthFine', 'fwidthCoarse', 'interpolateAtCentroid',
+    'interpolateAtSample', 'interpolateAtOffset',
+    'EmitVertex', 'EndPrimitive', 'EmitStreamVertex', 'EndStreamPrimitive',
+    'barrier', 'memoryBarrier', 'memoryBarrierAtomicCounter',
+    'memoryBarrierBuffer', 'memoryBarrierShared', 'memoryBarrierImage',
+    'groupMemoryBarrier', 'noise1', 'noise2', 'noise3', 'noise4',
+])
+
+# All the rules in one expression, so that each block is scanned once. The
+# group that matched (match.lastgroup) selects the format.
+tokenExpression = re.compile(r'''
+      (?P<comment>//.*)
+    | (?P<commentStart>/\*)
+    | (?P<preprocessor>^\s*\#\s*\w*)
+    | (?P<quotation>"(?:[^"\\]|\\.)*"?)
+    | (?P<word>[A-Za-z_]\w*)
+    | (?P<number>(?:0[xX][0-9A-Fa-f]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)(?:[uU]|[fF]|[lL][fF])?)
+''', re.VERBOSE)
+
 
 class Highlighter(QtGui.QSyntaxHighlighter):
+    """
+    GLSL highlighter that highlights large documents a chunk at a time.
+    Blocks it has not highlighted yet keep the state -1; at most chunkSize
+    of them are highlighted per change or timer tick, each from the state
+    of the block before it, so multi-line comments carry over between
+    chunks. highlightBlocks() highlights a range (the visible blocks) ahead
+    of the rest.
+    """
+
+    chunkSize = 200
+
     def __init__(self, parent=None):
         super().__init__(parent)
 
+        self.budget = self.chunkSize
+        self.forcedBlocks = None  # (first, last) block numbers highlighted out of order
+        self.pendingBlock = 0  # no block before this one is pending
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.highlightPending)
+
         self.keywordFormat = QtGui.QTextCharFormat()
         self.keywordFormat.setForeground(Qt.darkBlue)
         self.keywordFormat.setFontWeight(QtGui.QFont.Bold)
 
-        self.highlightingRules = []
-        for pattern in keywordPatterns:
-            self.highlightingRules.append((QtCore.QRegularExpression(pattern), self.keywordFormat))
+        self.typeFormat = QtGui.QTextCharFormat()
+        self.typeFormat.setFontWeight(QtGui.QFont.Bold)
+        self.typeFormat.setForeground(Qt.darkMagenta)
 
-        self.classFormat = QtGui.QTextCharFormat()
-        self.classFormat.setFontWeight(QtGui.QFont.Bold)
-        self.classFormat.setForeground(Qt.darkMagenta)
-        self.highlightingRules.append((QtCore.QRegularExpression(r'\bQ[A-Za-z]+\b'), self.classFormat))
+        self.builtinFormat = QtGui.QTextCharFormat()
+        self.builtinFormat.setForeground(Qt.darkCyan)
 
         self.quotationFormat = QtGui.QTextCharFormat()
         self.quotationFormat.setForeground(Qt.darkGreen)
-        self.highlightingRules.append((QtCore.QRegularExpression('".*"'), self.quotationFormat))
+
+        self.numberFormat = QtGui.QTextCharFormat()
+        self.numberFormat.setForeground(Qt.darkYellow)
+
+        self.preprocessorFormat = QtGui.QTextCharFormat()
+        self.preprocessorFormat.setForeground(Qt.darkGray)
 
         self.functionFormat = QtGui.QTextCharFormat()
         self.functionFormat.setFontItalic(True)
         self.functionFormat.setForeground(Qt.blue)
-        self.highlightingRules.append((QtCore.QRegularExpression(r'\b[A-Za-z0-9_]+(?=\()'), self.functionFormat))
 
         self.singleLineCommentFormat = QtGui.QTextCharFormat()
         self.singleLineCommentFormat.setForeground(Qt.red)
-        self.highlightingRules.append((QtCore.QRegularExpression('//[^\n]*'), self.singleLineCommentFormat))
 
         self.multiLineCommentFormat = QtGui.QTextCharFormat()
         self.multiLineCommentFormat.setForeground(Qt.red)
 
-        self.commentStartExpression = QtCore.QRegExp(r'/\*')
-        self.commentEndExpression = QtCore.QRegularExpression(r'\*/')
+        self.formats = {
+            'comment': self.singleLineCommentFormat,
+            'preprocessor': self.preprocessorFormat,
+            'quotation': self.quotationFormat,
+            'number': self.numberFormat,
+        }
+
+        self.wordFormats = dict.fromkeys(keywords, self.keywordFormat)
+        self.wordFormats.update(dict.fromkeys(types, self.typeFormat))
+        self.wordFormats.update(dict.fromkeys(builtins, self.builtinFormat))
 
     def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            matchIterator = pattern.globalMatch(text)
-            while matchIterator.hasNext():
-                match = matchIterator.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), format)
+        # Blocks highlighted before are always updated, like the default
+        # incremental rehighlighting does for edits
+        if self.currentBlockState() == -1:
+            number = self.currentBlock().blockNumber()
+            forced = self.forcedBlocks is not None and self.forcedBlocks[0] <= number <= self.forcedBlocks[1]
+            if not forced and (self.budget <= 0 or (number > 0 and self.previousBlockState() == -1)):
+                self.pendingBlock = min(self.pendingBlock, number)
+                self.timer.start()
+                return
 
+        self.budget -= 1
         self.setCurrentBlockState(0)
-        startIndex = 0
-        if self.previousBlockState() != 1:
-            startIndex = self.commentStartExpression.indexIn(text)
-
-        while startIndex >= 0:
-            match = self.commentEndExpression.match(text, startIndex)
-            endIndex = match.capturedStart()
-            commentLength = 0
-            if endIndex == -1:
-                self.setCurrentBlockState(1)
-                commentLength = len(text) - startIndex
+
+        pos = 0
+        if self.previousBlockState() == 1:
+            pos = self.highlightComment(text, 0, 0)
+
+        setFormat = self.setFormat
+        formats = self.formats
+        wordFormats = self.wordFormats
+        search = tokenExpression.search
+
+        while True:
+            match = search(text, pos)
+            if match is None:
+                break
+
+            kind = match.lastgroup
+            start, pos = match.span()
+
+            if kind == 'word':
+                word = match.group()
+                format = wordFormats.get(word)
+                if format is None:
+                    if word.startswith('gl_'):
+                        format = self.builtinFormat
+
+                    elif text.startswith('(', pos):
+                        format = self.functionFormat
+
+                    else:
+                        continue
+
+            elif kind == 'commentStart':
+                pos = self.highlightComment(text, start, pos)
+                continue
 
             else:
-                commentLength = endIndex - startIndex + match.capturedLength()
+                format = formats[kind]
+
+            setFormat(start, pos - start, format)
+
+    def highlightComment(self, text, start, pos):
+        """
+        Format the multi-line comment from start, looking for its end from
+        pos, and return where it ends
+        """
+        end = text.find('*/', pos)
+        if end == -1:
+            self.setCurrentBlockState(1)
+            end = len(text)
+
+        else:
+            end += 2
+
+        self.setFormat(start, end - start, self.multiLineCommentFormat)
+        return end
+
+    def highlightBlocks(self, first, last):
+        """
+        Highlight the pending blocks from first to last (QTextBlock objects)
+        now. Their state is carried over from the block before, or assumed
+        to be outside a comment if that one is pending too; they are
+        highlighted again if it turns out otherwise.
+        """
+        self.forcedBlocks = (first.blockNumber(), last.blockNumber())
+        self.budget = 0
+
+        try:
+            block = first
+            while block.isValid() and block.blockNumber() <= self.forcedBlocks[1]:
+                if block.userState() == -1:
+                    self.rehighlightBlock(block)
+
+                block = block.next()
+
+        finally:
+            self.forcedBlocks = None
+            self.budget = self.chunkSize
+
+    def highlightPending(self):
+        """Highlight the next chunk of pending blocks"""
+        document = self.document()
+        if document is None:
+            return
+
+        block = self.findPending(document.findBlockByNumber(self.pendingBlock))
+        if block is None and self.pendingBlock > 0:
+            # Blocks were removed above pendingBlock since it was set
+            block = self.findPending(document.firstBlock())
+
+        if block is None:
+            self.pendingBlock = document.blockCount()
+            return
+
+        # Start from the first of a run of pending blocks, which has its state to carry over
+        while block.previous().isValid() and block.previous().userState() == -1:
+            block = block.previous()
+
+        self.pendingBlock = document.blockCount()
+        self.budget = self.chunkSize
+
+        try:
+            self.rehighlightBlock(block)
+
+        finally:
+            self.budget = self.chunkSize
+
+        # The pass also ends without deferring anything when it reaches
+        # blocks highlighted ahead by highlightBlocks() whose state does not
+        # change, so look for pending blocks after them
+        block = self.findPending(block)
+        if block is not None:
+            self.pendingBlock = min(self.pendingBlock, block.blockNumber())
+            self.timer.start()
+
+    def findPending(self, block):
+        while block.isValid() and block.userState() != -1:
+            block = block.next()
 
-            self.setFormat(startIndex, commentLength, self.multiLineCommentFormat)
-            startIndex = self.commentStartExpression.indexIn(text, startIndex + commentLength)
+        return block if block.isValid() else None
@@ -1,56 +1,167 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import collections
 import os.path
-from PyQt5 import QtGui, QtWidgets
+from PyQt5 import QtCore, QtGui, QtWidgets
 import sip
 
 from highlighter import Highlighter
 import sharc
+Qt = QtCore.Qt
 
 
-class Sharc:
-    def __init__(self):
-        self.header = sharc.header = sharc.Header()
-        self.progList = sharc.List()
-        self.codeList = sharc.List()
+class ItemListModel(QtCore.QAbstractTableModel):
+    """
+    Table of the records of a sharc.List, edited in place. Typing into the
+    empty last row appends a new record made by the subclass's newItem(),
+    clearing the key cells (name and ID or value) of a row removes its
+    record.
+    """
 
-    def set(self, progList, codeList, header):
-        self.header = header
-        self.progList = progList
-        self.codeList = codeList
-        self.programCount = len(progList)
+    # (header, attribute, parse function) of each column
+    columns = ()
+    keyColumns = (0, 1)
 
+    def __init__(self, itemList):
+        super().__init__()
+        self.itemList = itemList
 
-class TableWidget(QtWidgets.QTableWidget):
-    def __init__(self, headers):
-        super().__init__(1, len(headers))
+        # (id() of the record, column) -> text, as formatting a large
+        # default value on every repaint is slow
+        self.texts = {}
 
-        self.cellChanged.connect(self.handleCellChange)
-        self.setSortingEnabled(False)
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.itemList) + 1
 
-        for i, header in enumerate(headers):
-            self.setHorizontalHeaderItem(i, QtWidgets.QTableWidgetItem())
-            self.horizontalHeaderItem(i).setText(header)
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
 
-    def handleCellChange(self, r, c):
-        rowCount = self.rowCount()
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.columns[section][0]
 
-        if r == rowCount - 1 and self.item(r, c).text():
-            self.setRowCount(rowCount + 1)
+        return super().headerData(section, orientation, role)
 
-        elif not any((self.item(r, c).text() if self.item(r, c) else False) for c in range(self.columnCount())):
-            self.removeRow(r)
+    def flags(self, index):
+        return super().flags(index) | Qt.ItemIsEditable
 
+    def getText(self, row, column):
+        if row == len(self.itemList):
+            return ''
 
-class ShaderMacro(TableWidget):
-    def __init__(self):
-        super().__init__(("Name", "Value"))
+        item = self.itemList[row]
+        key = (id(item), column)
 
+        text = self.texts.get(key)
+        if text is None:
+            text = self.texts[key] = str(getattr(item, self.columns[column][1]))
 
-class ShaderSymbol(TableWidget):
-    def __init__(self):
-        super().__init__(("Name", "ID", "Default Value", "Offset"))
+        return text
+
+    def forgetTexts(self, item):
+        for column in range(len(self.columns)):
+            self.texts.pop((id(item), column), None)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self.getText(index.row(), index.column())
+
+        return None
+
+    def setValue(self, item, column, text):
+        _, attr, parse = self.columns[column]
+        setattr(item, attr, parse(text))
+
+    def setData(self, index, text, role=Qt.EditRole):
+        if role != Qt.EditRole:
+            return False
+
+        row = index.row()
+        column = index.column()
+        if text == self.getText(row, column):
+            return False
+
+        new = row == len(self.itemList)
+        item = self.newItem() if new else self.itemList[row]
+
+        try:
+            self.setValue(item, column, text)
+
+        except Exception:
+            # Not a valid value for the column, keep the old one
+            return False
+
+        self.forgetTexts(item)
+
+        if new:
+            self.beginInsertRows(QtCore.QModelIndex(), row + 1, row + 1)
+            self.itemList.append(item)
+            self.endInsertRows()
+
+        elif not any(self.getText(row, c) for c in self.keyColumns):
+            self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+            self.itemList.pop(row)
+            self.endRemoveRows()
+
+            self.forgetTexts(item)
+
+            return True
+
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.columns) - 1))
+        return True
+
+
+class ShaderMacroModel(ItemListModel):
+    columns = (
+        ("Name", 'name', str),
+        ("Value", 'value', str),
+    )
+
+    def newItem(self):
+        return sharc.ShaderMacro(self.itemList.endianness)
+
+
+class ShaderSymbolModel(ItemListModel):
+    columns = (
+        ("Name", 'name', str),
+        ("ID", 'ID', str),
+        ("Default Value", 'defaultValueText', str),
+        ("Offset", 'param', int),
+    )
+
+    def newItem(self):
+        sym = sharc.ShaderSymbol(self.itemList.endianness)
+        sym.validVariations = [True]
+
+        return sym
+
+
+class UniformBlockModel(ShaderSymbolModel):
+    columns = ShaderSymbolModel.columns[:3]
+
+    def setValue(self, item, column, text):
+        super().setValue(item, column, text)
+        item.param = len(item.defaultValue)
+
+
+class SamplerVariableModel(ShaderSymbolModel):
+    # Also used for vertex attributes, neither have a value
+    columns = ShaderSymbolModel.columns[:2]
+
+    def newItem(self):
+        sym = super().newItem()
+        sym.param = -1
+
+        return sym
+
+
+class TableView(QtWidgets.QTableView):
+    def __init__(self, model):
+        super().__init__()
+
+        self.setModel(model)
+        self.setSortingEnabled(False)
 
 
 class TabWidget(QtWidgets.QWidget):
@@ -80,29 +191,119 @@ class TabWidget(QtWidgets.QWidget):
         self._stackedWidget.setCurrentIndex(index)
 
 
-class ShaderSource(QtWidgets.QTextEdit):
+def getSourceFont():
+    font = QtGui.QFont("Inconsolata", 10)
+    font.setFixedPitch(True)
+    font.setStyleStrategy(QtGui.QFont.PreferAntialias)
+
+    return font
+
+
+def createPlainTextDocument(parent=None):
+    # What QPlainTextEdit needs: its layout only relayouts the blocks that
+    # change, where the default one does far more work for each change
+    document = QtGui.QTextDocument(parent)
+    document.setDocumentLayout(QtWidgets.QPlainTextDocumentLayout(document))
+
+    return document
+
+
+class SourceDocuments:
+    """
+    Highlighted QTextDocument of each source, created when first shown and
+    shared by every editor showing that source. Once the documents add up
+    to more than maxSize characters, the least recently used are dropped
+    (editors still showing one keep it alive).
+    """
+
+    maxSize = 16 * 1024 * 1024
+
     def __init__(self):
-        super().__init__()
+        # id() of the sharc.ShaderSource -> document
+        self.documents = collections.OrderedDict()
+        self.font = getSourceFont()
+
+    def get(self, code):
+        key = id(code)
+
+        document = self.documents.get(key)
+        if document is not None:
+            self.documents.move_to_end(key)
+            return document
+
+        document = createPlainTextDocument()
+        document.setDefaultFont(self.font)
+
+        # Attached after setting the text: QTextDocument.setPlainText()
+        # cancels the highlighting scheduled when a highlighter is attached
+        document.setPlainText(code.code)
+        Highlighter(document)
+
+        self.documents[key] = document
+
+        size = sum([document.characterCount() for document in self.documents.values()])
+        while size > self.maxSize and len(self.documents) > 1:
+            size -= self.documents.popitem(last=False)[1].characterCount()
 
-        font = QtGui.QFont("Inconsolata", 10)
-        font.setFixedPitch(True)
-        font.setStyleStrategy(QtGui.QFont.PreferAntialias)
+        return document
 
-        self.setFont(font)
+    def remove(self, code):
+        self.documents.pop(id(code), None)
+
+    def clear(self):
+        self.documents.clear()
+
+
+class ShaderSource(QtWidgets.QPlainTextEdit):
+    def __init__(self):
+        super().__init__()
+
+        self.setFont(getSourceFont())
         self.setReadOnly(True)
 
+        # The editor does not own the documents it shows, keep a reference
+        self._source = None
+        self._highlighter = None
+        self._empty = createPlainTextDocument(self)
+
+        self.verticalScrollBar().valueChanged.connect(lambda value: self.highlightVisible())
+
+    def setSource(self, document):
+        self._source = document
+        self._highlighter = None if document is None else document.findChild(Highlighter)
+        self.setDocument(self._empty if document is None else document)
+        self.highlightVisible()
+
+    def highlightVisible(self):
+        # Large sources are highlighted in chunks, get the visible part done first
+        if self._highlighter is not None:
+            first = self.firstVisibleBlock()
+            last = self.cursorForPosition(QtCore.QPoint(0, self.viewport().height() - 1)).block()
+            self._highlighter.highlightBlocks(first, last)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.highlightVisible()
+
 
 class ShaderSourceTab(QtWidgets.QWidget):
-    def __init__(self, parent, type):
+    def __init__(self, parent, program, attr):
         super().__init__()
 
         self._parent = parent
-        self._type = type
+
+        # The source index of the program shown, vtxShIdx or frgShIdx,
+        # which the combo box edits directly
+        self._program = program
+        self._attr = attr
 
         fileLabel = QtWidgets.QLabel()
         fileLabel.setText("File:")
 
+        # All combo boxes share the list of sources, "None" first
         self._fileComboBox = QtWidgets.QComboBox()
+        self._fileComboBox.setModel(parent.sourceModel)
+        self._fileComboBox.setCurrentIndex(getattr(program, attr) + 1)
         self._fileComboBox.currentIndexChanged.connect(self.currentChanged)
 
         fileLayout = QtWidgets.QHBoxLayout()
@@ -110,55 +311,49 @@ class ShaderSourceTab(QtWidgets.QWidget):
         fileLayout.addWidget(self._fileComboBox)
 
         self._editor = ShaderSource()
-        Highlighter(self._editor.document())
 
         layout = QtWidgets.QVBoxLayout(self)
         layout.addLayout(fileLayout)
         layout.addWidget(self._editor)
 
-    def addItems(self, texts):
-        self._fileComboBox.addItem("None")
-        self._fileComboBox.addItems(texts)
-
-    def setCurrentIndex(self, index):
-        self._fileComboBox.setCurrentIndex(index + 1)
-
-    def currentIndex(self):
-        return self._fileComboBox.currentIndex() - 1
-
-    def clear(self):
-        self._fileComboBox.clear()
+        self.showSource(self._fileComboBox.currentIndex() - 1)
 
     def currentChanged(self, index):
         if index == -1:
             return
 
-        if index == 0:
-            self._editor.clear()
+        # Also called when a source before the current one is removed from
+        # the shared list, by which time the program was already updated
+        index -= 1
+        if getattr(self._program, self._attr) != index:
+            setattr(self._program, self._attr, index)
+
+        self.showSource(index)
+
+    def showSource(self, index):
+        if index < 0:
+            self._editor.setSource(None)
 
         else:
-            self._editor.setPlainText(self._parent.sharc.codeList[index - 1].code)
+            self._editor.setSource(self._parent.sourceDocuments.get(self._parent.sharc.codeList[index]))
 
 
 class ShaderProgram(TabWidget):
-    def __init__(self, parent):
+    def __init__(self, parent, program):
         super().__init__()
 
-        self.vertexMacros = ShaderMacro()
-        self.fragmentMacros = ShaderMacro()
-        self.uniformVars = ShaderSymbol()
-        self.uniformBlocks = ShaderSymbol()
-        self.samplerVars = ShaderSymbol()
-        self.vertexAttribs = ShaderSymbol()
+        # The sharc.ShaderProgram shown, which the tables edit directly
+        self.program = program
 
-        self.vertexCode = ShaderSourceTab(parent, 0)
-        self.fragmentCode = ShaderSourceTab(parent, 1)
+        self.vertexMacros = TableView(ShaderMacroModel(program.vertexMacros))
+        self.fragmentMacros = TableView(ShaderMacroModel(program.fragmentMacros))
+        self.uniformVars = TableView(ShaderSymbolModel(program.uniformVariables))
+        self.uniformBlocks = TableView(UniformBlockModel(program.uniformBlocks))
+        self.samplerVars = TableView(SamplerVariableModel(program.samplerVariables))
+        self.vertexAttribs = TableView(SamplerVariableModel(program.attribVariables))
 
-        self.uniformBlocks.setColumnHidden(3, True)
-        self.samplerVars.setColumnHidden(2, True)
-        self.samplerVars.setColumnHidden(3, True)
-        self.vertexAttribs.setColumnHidden(2, True)
-        self.vertexAttribs.setColumnHidden(3, True)
+        self.vertexCode = ShaderSourceTab(parent, program, 'vtxShIdx')
+        self.fragmentCode = ShaderSourceTab(parent, program, 'frgShIdx')
 
         vertexTab = TabWidget()
         vertexTab.addTab(self.vertexMacros, "Macros")
@@ -179,14 +374,70 @@ class ShaderProgram(TabWidget):
         self.addTab(self.vertexAttribs, "Vertex Attributes")
 
 
+class Loader(QtCore.QThread):
+    """Loads an archive off the GUI thread"""
+
+    loaded = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, path, diagnostics):
+        super().__init__()
+        self.path = path
+        self.diagnostics = diagnostics
+
+    def run(self):
+        archive = sharc.Archive()
+
+        # Programs are only parsed when first shown. Unmodified programs are
+        # saved by copying their loaded bytes, so keep those in memory rather
+        # than mapping the file we may overwrite
+        try:
+            archive.loadPath(self.path, mmap=False, lazy=True, diagnostics=self.diagnostics)
+
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+
+        self.loaded.emit(archive)
+
+
 class MainWindow(QtWidgets.QWidget):
+    # Program and source pages are only built when first shown, and at
+    # most this many are kept, dropping the least recently shown first
+    maxPages = 32
+
+    # Validation diagnostics listed in one message box at most
+    maxDiagnostics = 20
+
+    # Tree items added per timer tick while filling in the tree
+    populateBatch = 500
+
     def __init__(self):
         super().__init__()
 
         self.setWindowTitle("SharcEditor v0.2 - (C) 2019-2023 AboodXD")
 
-        self.sharc = Sharc()
-        self.codeFiles = []
+        self.sharc = sharc.Archive()
+
+        # Validation problems of the programs parsed so far and not shown
+        # yet. Programs are parsed lazily, so these come in as they are used
+        self.diagnostics = []
+
+        # Source names for the combo boxes of the program pages
+        self.sourceModel = QtCore.QStringListModel(["None"])
+        self.sourceDocuments = SourceDocuments()
+
+        # id() of the record shown -> page, least recently shown first
+        self.pages = collections.OrderedDict()
+
+        # Loader of the file being opened, and every one still running
+        # (including cancelled ones, which must outlive their thread)
+        self.loader = None
+        self.loaders = []
+
+        self.populateTimer = QtCore.QTimer(self)
+        self.populateTimer.timeout.connect(self.populate)
+        self.pendingItems = None
 
         fileLabel = QtWidgets.QLabel()
         fileLabel.setText("File:")
@@ -203,9 +454,18 @@ class MainWindow(QtWidgets.QWidget):
         saveAsButton = QtWidgets.QPushButton("Save As")
         saveAsButton.clicked.connect(self.saveFileAs)
 
+        self.progressBar = QtWidgets.QProgressBar()
+        self.progressBar.hide()
+
+        self.cancelButton = QtWidgets.QPushButton("Cancel")
+        self.cancelButton.clicked.connect(self.cancelLoading)
+        self.cancelButton.hide()
+
         fileLayout = QtWidgets.QHBoxLayout()
         fileLayout.addWidget(fileLabel)
         fileLayout.addWidget(self.fileLineEdit)
+        fileLayout.addWidget(self.progressBar)
+        fileLayout.addWidget(self.cancelButton)
         fileLayout.addWidget(openButton)
         fileLayout.addWidget(saveButton)
         fileLayout.addWidget(saveAsButton)
@@ -229,6 +489,9 @@ class MainWindow(QtWidgets.QWidget):
         buttonsLayout.addWidget(addButton)
         buttonsLayout.addWidget(removeButton)
 
+        # Disabled while a file is loading
+        self.editButtons = (saveButton, saveAsButton, addButton, removeButton)
+
         treeLayout = QtWidgets.QVBoxLayout()
         treeLayout.addWidget(self.treeWidget)
         treeLayout.addLayout(buttonsLayout)
@@ -243,144 +506,171 @@ class MainWindow(QtWidgets.QWidget):
         layout.addLayout(fileLayout)
         layout.addLayout(viewLayout)
 
-    def getProgramCount(self):
-        return self.sharc.programCount
+    def getPage(self, record):
+        key = id(record)
+
+        page = self.pages.get(key)
+        if page is not None:
+            self.pages.move_to_end(key)
+            return page
+
+        if isinstance(record, sharc.ShaderProgram):
+            page = ShaderProgram(self, record)
+
+        else:
+            page = ShaderSource()
+            page.setSource(self.sourceDocuments.get(record))
+
+        self.pages[key] = page
+        self.widgets.addWidget(page)
+
+        while len(self.pages) > self.maxPages:
+            self.removePage(next(iter(self.pages)))
+
+        return page
+
+    def removePage(self, key):
+        page = self.pages.pop(key, None)
+        if page is not None:
+            self.widgets.removeWidget(page)
+            sip.delete(page)
 
     def closeFile(self):
-        for i in range(self.widgets.count() - 1, -1, -1):
-            j = int(i >= self.getProgramCount())
-            sip.delete(self.treeWidget.topLevelItem(j).child(i - j * self.getProgramCount()))
-            sip.delete(self.widgets.widget(i))
+        for key in list(self.pages):
+            self.removePage(key)
+
+        for i in range(2):
+            for item in self.treeWidget.topLevelItem(i).takeChildren():
+                sip.delete(item)
 
         self.treeWidget.topLevelItem(0).setSelected(False)
         self.treeWidget.topLevelItem(1).setSelected(False)
 
-        self.sharc = Sharc()
-        self.codeFiles = []
+        self.sharc = sharc.Archive()
+        self.diagnostics = []
+        self.sourceModel.setStringList(["None"])
+        self.sourceDocuments.clear()
 
     def openFile(self):
         file = QtWidgets.QFileDialog.getOpenFileName(None, "Open File", "", "AGL Resource Shader Archive (*.sharc)")[0]
         if not (file and os.path.isfile(file)):
             return
 
+        self.cancelLoading()
         self.closeFile()
         self.fileLineEdit.setText(file)
 
-        with open(file, 'rb') as inf:
-            inb = inf.read()
+        self.setLoading(True)
+        self.progressBar.setRange(0, 0)
 
-        self.sharc.set(*sharc.load(inb), sharc.header)
+        self.loader = loader = Loader(file, self.diagnostics)
+        loader.loaded.connect(self.fileLoaded)
+        loader.failed.connect(self.loadFailed)
+        loader.finished.connect(lambda: self.loaders.remove(loader))
 
-        self.codeFiles = []
-        for code in self.sharc.codeList:
-            self.codeFiles.append(code.name)
+        self.loaders.append(loader)
+        loader.start()
 
-        for program in self.sharc.progList:
-            programWidget = ShaderProgram(self)
-            programWidget.vertexCode.addItems(self.codeFiles)
-            programWidget.fragmentCode.addItems(self.codeFiles)
-            programWidget.vertexCode.setCurrentIndex(program.vtxShIdx)
-            programWidget.fragmentCode.setCurrentIndex(program.frgShIdx)
+    def setLoading(self, loading):
+        self.progressBar.setVisible(loading)
+        self.cancelButton.setVisible(loading)
 
-            for i, macro in enumerate(program.vertexMacros):
-                nameCell = QtWidgets.QTableWidgetItem()
-                valueCell = QtWidgets.QTableWidgetItem()
+        for button in self.editButtons:
+            button.setEnabled(not loading)
 
-                nameCell.setText(macro.name)
-                valueCell.setText(macro.value)
+    def cancelLoading(self):
+        if self.loader is None and self.pendingItems is None:
+            return
 
-                programWidget.vertexMacros.setItem(i, 0, nameCell)
-                programWidget.vertexMacros.setItem(i, 1, valueCell)
-                programWidget.vertexMacros.setRowCount(i + 2)
+        # A running loader can't be interrupted, its result is ignored
+        self.loader = None
+        self.populateTimer.stop()
+        self.pendingItems = None
 
-            for i, macro in enumerate(program.fragmentMacros):
-                nameCell = QtWidgets.QTableWidgetItem()
-                valueCell = QtWidgets.QTableWidgetItem()
+        self.closeFile()
+        self.fileLineEdit.clear()
+        self.setLoading(False)
 
-                nameCell.setText(macro.name)
-                valueCell.setText(macro.value)
+    def loadFailed(self, message):
+        if self.sender() is not self.loader:
+            return
 
-                programWidget.fragmentMacros.setItem(i, 0, nameCell)
-                programWidget.fragmentMacros.setItem(i, 1, valueCell)
-                programWidget.fragmentMacros.setRowCount(i + 2)
+        self.loader = None
+        self.fileLineEdit.clear()
+        self.setLoading(False)
 
-            for i, sym in enumerate(program.uniformVariables):
-                nameCell = QtWidgets.QTableWidgetItem()
-                idCell = QtWidgets.QTableWidgetItem()
-                defaultValCell = QtWidgets.QTableWidgetItem()
-                offsetCell = QtWidgets.QTableWidgetItem()
+        QtWidgets.QMessageBox.warning(self, "Open File", "Could not open the file:\n%s" % message)
 
-                nameCell.setText(sym.name)
-                idCell.setText(sym.ID)
-                defaultValCell.setText(str(sym.defaultValue))
-                offsetCell.setText(str(sym.param))
+    def fileLoaded(self, archive):
+        if self.sender() is not self.loader:
+            return
 
-                programWidget.uniformVars.setItem(i, 0, nameCell)
-                programWidget.uniformVars.setItem(i, 1, idCell)
-                programWidget.uniformVars.setItem(i, 2, defaultValCell)
-                programWidget.uniformVars.setItem(i, 3, offsetCell)
-                programWidget.uniformVars.setRowCount(i + 2)
+        self.loader = None
+        self.sharc = archive
+        sourceNames = archive.codeList.getNames()
+        self.sourceModel.setStringList(["None"] + sourceNames)
 
-            for i, sym in enumerate(program.uniformBlocks):
-                nameCell = QtWidgets.QTableWidgetItem()
-                idCell = QtWidgets.QTableWidgetItem()
-                defaultValCell = QtWidgets.QTableWidgetItem()
+        # Fill in the tree in batches, pages are built when first selected
+        names = archive.progList.getNames()
+        self.pendingItems = [(1, name) for name in names] + [(2, name) for name in sourceNames]
+        self.pendingItems.reverse()
 
-                nameCell.setText(sym.name)
-                idCell.setText(sym.ID)
-                defaultValCell.setText(str(sym.defaultValue))
+        self.progressBar.setRange(0, len(self.pendingItems))
+        self.progressBar.setValue(0)
+        self.populateTimer.start(0)
 
-                programWidget.uniformBlocks.setItem(i, 0, nameCell)
-                programWidget.uniformBlocks.setItem(i, 1, idCell)
-                programWidget.uniformBlocks.setItem(i, 2, defaultValCell)
-                programWidget.uniformBlocks.setRowCount(i + 2)
+        if len(archive.progList):
+            self.treeWidget.topLevelItem(0).setExpanded(True)
 
-            for i, sym in enumerate(program.samplerVariables):
-                nameCell = QtWidgets.QTableWidgetItem()
-                idCell = QtWidgets.QTableWidgetItem()
+        if len(archive.codeList):
+            self.treeWidget.topLevelItem(1).setExpanded(True)
 
-                nameCell.setText(sym.name)
-                idCell.setText(sym.ID)
+    def populate(self):
+        items = ([], [])
+        for _ in range(min(self.populateBatch, len(self.pendingItems))):
+            type, name = self.pendingItems.pop()
 
-                programWidget.samplerVars.setItem(i, 0, nameCell)
-                programWidget.samplerVars.setItem(i, 1, idCell)
-                programWidget.samplerVars.setRowCount(i + 2)
+            item = QtWidgets.QTreeWidgetItem(type)
+            item.setText(0, name)
+            items[type - 1].append(item)
 
-            for i, sym in enumerate(program.attribVariables):
-                nameCell = QtWidgets.QTableWidgetItem()
-                idCell = QtWidgets.QTableWidgetItem()
+        for i in range(2):
+            if items[i]:
+                self.treeWidget.topLevelItem(i).addChildren(items[i])
 
-                nameCell.setText(sym.name)
-                idCell.setText(sym.ID)
+        self.progressBar.setValue(self.progressBar.maximum() - len(self.pendingItems))
+        if self.pendingItems:
+            return
 
-                programWidget.vertexAttribs.setItem(i, 0, nameCell)
-                programWidget.vertexAttribs.setItem(i, 1, idCell)
-                programWidget.vertexAttribs.setRowCount(i + 2)
+        self.populateTimer.stop()
+        self.pendingItems = None
+        self.setLoading(False)
 
-            programItem = QtWidgets.QTreeWidgetItem(1)
-            programItem.setText(0, program.name)
-            self.treeWidget.topLevelItem(0).addChild(programItem)
-            self.widgets.addWidget(programWidget)
+        if len(self.sharc.progList):
+            self.treeWidget.topLevelItem(0).child(0).setSelected(True)
 
-        for code in self.sharc.codeList:
-            source = ShaderSource()
-            Highlighter(source.document())
-            source.setPlainText(code.code)
+    def showDiagnostics(self):
+        if not self.diagnostics:
+            return
 
-            sourceItem = QtWidgets.QTreeWidgetItem(2)
-            sourceItem.setText(0, code.name)
-            self.treeWidget.topLevelItem(1).addChild(sourceItem)
-            self.widgets.addWidget(source)
+        lines = [str(diagnostic) for diagnostic in self.diagnostics[:self.maxDiagnostics]]
+        if len(self.diagnostics) > self.maxDiagnostics:
+            lines.append("... and %d more" % (len(self.diagnostics) - self.maxDiagnostics))
 
-        if self.getProgramCount() > 0:
-            self.treeWidget.topLevelItem(0).setExpanded(True)
-            self.treeWidget.topLevelItem(0).child(0).setSelected(True)
+        self.diagnostics.clear()
 
-        if len(self.sharc.codeList):
-            self.treeWidget.topLevelItem(1).setExpanded(True)
+        QtWidgets.QMessageBox.warning(self, "Validation", "Some shader programs look inconsistent:\n%s" % "\n".join(lines))
+
+    def showReadError(self, name, e):
+        # Programs are parsed and validated on first use, which can fail
+        # long after the file was opened
+        QtWidgets.QMessageBox.critical(self, "Invalid Data", "Could not read %s:\n%s" % (name, str(e) or type(e).__name__))
 
     def add(self):
         current = self.treeWidget.currentItem()
+        if current is None:
+            return
+
         if current.type() == 0:
             index = self.treeWidget.indexOfTopLevelItem(current)
 
@@ -395,22 +685,17 @@ class MainWindow(QtWidgets.QWidget):
             if not name:
                 return
 
-            for i in range(self.treeWidget.topLevelItem(0).childCount()):
-                programItem = self.treeWidget.topLevelItem(0).child(i)
-                if programItem.text(0) == name:
-                    return
+            if name in self.sharc.progList:
+                return
+
+            program = sharc.ShaderProgram(self.sharc.endianness)
+            program.name = name
 
-            programWidget = ShaderProgram(self)
-            programWidget.vertexCode.addItems(self.codeFiles)
-            programWidget.fragmentCode.addItems(self.codeFiles)
-            programWidget.vertexCode.setCurrentIndex(-1)
-            programWidget.fragmentCode.setCurrentIndex(-1)
+            self.sharc.progList.append(program)
 
             programItem = QtWidgets.QTreeWidgetItem(1)
             programItem.setText(0, name)
             self.treeWidget.topLevelItem(0).addChild(programItem)
-            self.widgets.addWidget(programWidget)
-            self.sharc.programCount += 1
 
         else:
             file = QtWidgets.QFileDialog.getOpenFileName(None, "Open File", "", "GLSL Shader (*.sh *.glsl)")[0]
@@ -418,12 +703,10 @@ class MainWindow(QtWidgets.QWidget):
                 return
 
             name = os.path.basename(file)
-            if name in self.codeFiles:
+            if name in self.sharc.codeList:
                 return
 
-            self.codeFiles.append(name)
-
-            code = sharc.ShaderSource()
+            code = sharc.ShaderSource(self.sharc.endianness)
             code.name = name
 
             with open(file, encoding='utf-8') as inf:
@@ -431,201 +714,120 @@ class MainWindow(QtWidgets.QWidget):
 
             self.sharc.codeList.append(code)
 
-            source = ShaderSource()
-            Highlighter(source.document())
-            source.setPlainText(code.code)
-
             sourceItem = QtWidgets.QTreeWidgetItem(2)
             sourceItem.setText(0, code.name)
             self.treeWidget.topLevelItem(1).addChild(sourceItem)
-            self.widgets.addWidget(source)
 
-            for i in range(self.getProgramCount()):
-                programWidget = self.widgets.widget(i)
-
-                vtxShIdx = programWidget.vertexCode.currentIndex()
-                programWidget.vertexCode.clear()
-                programWidget.vertexCode.addItems(self.codeFiles)
-                programWidget.vertexCode.setCurrentIndex(vtxShIdx)
-
-                frgShIdx = programWidget.fragmentCode.currentIndex()
-                programWidget.fragmentCode.clear()
-                programWidget.fragmentCode.addItems(self.codeFiles)
-                programWidget.fragmentCode.setCurrentIndex(frgShIdx)
+            row = self.sourceModel.rowCount()
+            self.sourceModel.insertRows(row, 1)
+            self.sourceModel.setData(self.sourceModel.index(row), name)
 
     def remove(self):
         current = self.treeWidget.currentItem()
-        if current.type() == 0:
-            index = self.treeWidget.indexOfTopLevelItem(current)
-
-        else:
-            index = current.type() - 1
-
-        if index == 0:
-            index = self.widgets.currentIndex()
-            if index < 0:
-                return
-
-            # self.sharc.progList.pop(index)
-            self.sharc.programCount -= 1
-
-            sip.delete(self.treeWidget.topLevelItem(0).child(index))
-            sip.delete(self.widgets.currentWidget())
-
-        else:
-            index = self.widgets.currentIndex() - self.getProgramCount()
-            if index < 0:
-                return
-
-            for i in range(self.getProgramCount()):
-                programWidget = self.widgets.widget(i)
-                if index in (programWidget.vertexCode.currentIndex(), programWidget.fragmentCode.currentIndex()):
-                    return
-
-            self.codeFiles.pop(index)
-            self.sharc.codeList.pop(index)
-
-            sip.delete(self.treeWidget.topLevelItem(1).child(index))
-            sip.delete(self.widgets.currentWidget())
-
-            for i in range(self.getProgramCount()):
-                programWidget = self.widgets.widget(i)
-
-                vtxShIdx = programWidget.vertexCode.currentIndex()
-                programWidget.vertexCode.clear()
-                programWidget.vertexCode.addItems(self.codeFiles)
-                if vtxShIdx > index:
-                    programWidget.vertexCode.setCurrentIndex(vtxShIdx - 1)
-
-                else:
-                    programWidget.vertexCode.setCurrentIndex(vtxShIdx)
-
-                frgShIdx = programWidget.fragmentCode.currentIndex()
-                programWidget.fragmentCode.clear()
-                programWidget.fragmentCode.addItems(self.codeFiles)
-                if frgShIdx > index:
-                    programWidget.fragmentCode.setCurrentIndex(frgShIdx - 1)
-
-                else:
-                    programWidget.fragmentCode.setCurrentIndex(frgShIdx)
-
-    def save(self):
-        self.sharc.progList = sharc.List()
-        for i in range(self.getProgramCount()):
-            programWidget = self.widgets.widget(i)
-            programItem = self.treeWidget.topLevelItem(0).child(i)
-
-            program = sharc.ShaderProgram()
-            program.name = programItem.text(0)
-            program.vtxShIdx = programWidget.vertexCode.currentIndex()
-            program.frgShIdx = programWidget.fragmentCode.currentIndex()
-
-            for r in range(programWidget.vertexMacros.rowCount() - 1):
-                nameCell = programWidget.vertexMacros.item(r, 0)
-                valueCell = programWidget.vertexMacros.item(r, 1)
-
-                macro = sharc.ShaderMacro()
-                macro.name = nameCell.text()
-                macro.value = valueCell.text()
+        if current is None:
+            return
 
-                program.vertexMacros.append(macro)
+        if current.type() == 1:
+            index = self.treeWidget.topLevelItem(0).indexOfChild(current)
 
-            for r in range(programWidget.fragmentMacros.rowCount() - 1):
-                nameCell = programWidget.fragmentMacros.item(r, 0)
-                valueCell = programWidget.fragmentMacros.item(r, 1)
+            program = self.sharc.progList.pop(index)
+            self.removePage(id(program))
 
-                macro = sharc.ShaderMacro()
-                macro.name = nameCell.text()
-                macro.value = valueCell.text()
+            sip.delete(current)
 
-                program.fragmentMacros.append(macro)
+        elif current.type() == 2:
+            index = self.treeWidget.topLevelItem(1).indexOfChild(current)
 
-            for r in range(programWidget.uniformVars.rowCount() - 1):
-                nameCell = programWidget.uniformVars.item(r, 0)
-                idCell = programWidget.uniformVars.item(r, 1)
-                defaultValCell = programWidget.uniformVars.item(r, 2)
-                offsetCell = programWidget.uniformVars.item(r, 3)
+            # This parses every program not parsed yet
+            progList = self.sharc.progList
+            try:
+                for i in range(len(progList)):
+                    program = progList[i]
+                    if index in (program.vtxShIdx, program.frgShIdx, program.geoShIdx):
+                        return
 
-                sym = sharc.ShaderSymbol()
-                sym.name = nameCell.text()
-                sym.ID = idCell.text()
-                sym.defaultValue = eval(defaultValCell.text())
-                sym.param = int(offsetCell.text())
-                sym.validVariations = [True]
+            except Exception as e:
+                self.showReadError(progList.getName(i), e)
+                return
 
-                program.uniformVariables.append(sym)
+            finally:
+                self.showDiagnostics()
 
-            for r in range(programWidget.uniformBlocks.rowCount() - 1):
-                nameCell = programWidget.uniformBlocks.item(r, 0)
-                idCell = programWidget.uniformBlocks.item(r, 1)
-                defaultValCell = programWidget.uniformBlocks.item(r, 2)
+            code = self.sharc.codeList.pop(index)
+            self.removePage(id(code))
+            self.sourceDocuments.remove(code)
 
-                sym = sharc.ShaderSymbol()
-                sym.name = nameCell.text()
-                sym.ID = idCell.text()
-                sym.defaultValue = eval(defaultValCell.text())
-                sym.param = len(sym.defaultValue)
-                sym.validVariations = [True]
+            sip.delete(current)
 
-                program.uniformBlocks.append(sym)
+            for program in self.sharc.progList:
+                if program.vtxShIdx > index:
+                    program.vtxShIdx -= 1
 
-            for r in range(programWidget.samplerVars.rowCount() - 1):
-                nameCell = programWidget.samplerVars.item(r, 0)
-                idCell = programWidget.samplerVars.item(r, 1)
+                if program.frgShIdx > index:
+                    program.frgShIdx -= 1
 
-                sym = sharc.ShaderSymbol()
-                sym.name = nameCell.text()
-                sym.ID = idCell.text()
-                sym.defaultValue = b''
-                sym.param = -1
-                sym.validVariations = [True]
-
-                program.samplerVariables.append(sym)
+                if program.geoShIdx > index:
+                    program.geoShIdx -= 1
 
-            for r in range(programWidget.vertexAttribs.rowCount() - 1):
-                nameCell = programWidget.vertexAttribs.item(r, 0)
-                idCell = programWidget.vertexAttribs.item(r, 1)
-
-                sym = sharc.ShaderSymbol()
-                sym.name = nameCell.text()
-                sym.ID = idCell.text()
-                sym.defaultValue = b''
-                sym.param = -1
-                sym.validVariations = [True]
-
-                program.attribVariables.append(sym)
-
-            self.sharc.progList.append(program)
+            # The combo boxes showing later sources follow their rows
+            self.sourceModel.removeRows(index + 1, 1)
 
     def saveFile(self):
         file = self.fileLineEdit.text()
         if not file:
             return self.saveFileAs()
 
-        self.save()
-
-        with open(file, "wb") as out:
-            out.write(sharc.save(self.sharc.progList, self.sharc.codeList))
+        self.saveTo(file)
 
     def saveFileAs(self):
         file = QtWidgets.QFileDialog.getSaveFileName(None, "Save File As", "", "AGL Resource Shader Archive (*.sharc)")[0]
         if not file:
             return
 
-        self.save()
-        self.sharc.header.name = os.path.splitext(os.path.basename(file))[0]
+        self.sharc.name = os.path.splitext(os.path.basename(file))[0]
         self.fileLineEdit.setText(file)
 
-        with open(file, "wb") as out:
-            out.write(sharc.save(self.sharc.progList, self.sharc.codeList))
+        self.saveTo(file)
+
+    def saveTo(self, file):
+        try:
+            self.sharc.savePath(file)
+
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, "Save Failed", "Could not save %s:\n%s" % (file, e))
+
+    def closeEvent(self, event):
+        # Loader threads must not be destroyed while running
+        for loader in self.loaders:
+            loader.wait()
+
+        super().closeEvent(event)
 
     def currentChanged(self, item):
+        if item is None:
+            return
+
         type = item.type()
-        if type == 1:
-            self.widgets.setCurrentIndex(self.treeWidget.topLevelItem(0).indexOfChild(item))
+        if type not in (1, 2):
+            return
+
+        try:
+            if type == 1:
+                record = self.sharc.progList[self.treeWidget.topLevelItem(0).indexOfChild(item)]
+
+            else:
+                record = self.sharc.codeList[self.treeWidget.topLevelItem(1).indexOfChild(item)]
+
+            page = self.getPage(record)
+
+        except Exception as e:
+            self.showReadError(item.text(0), e)
+            return
+
+        finally:
+            self.showDiagnostics()
 
-        elif type == 2:
-            self.widgets.setCurrentIndex(self.treeWidget.topLevelItem(1).indexOfChild(item) + self.getProgramCount())
+        self.widgets.setCurrentWidget(page)
 
 
 if __name__ == '__main__':
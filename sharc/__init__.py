@@ -0,0 +1,1790 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import array
+import ast
+import mmap as mmapModule
+import operator
+import os
+import re
+import struct
+import sys
+import threading
+
+
+nativeEndianness = '<' if sys.byteorder == 'little' else '>'
+
+
+def field(name, mutable=False, indexed=False):
+    """
+    Record attribute stored as _<name>. Assigning it marks the record as
+    dirty; for mutable values, which may be changed in place, so does
+    reading it. Records read their own fields through the _<name> names.
+    Assigning an indexed field, the name of records in a List, makes the
+    lists rebuild their name index (see List.renames).
+    """
+    attr = '_' + name
+
+    def fset(record, value):
+        setattr(record, attr, value)
+        record.dirty = True
+
+        if indexed:
+            List.renames += 1
+
+    if not mutable:
+        return property(operator.attrgetter(attr), fset)
+
+    def fget(record):
+        record.dirty = True
+        return getattr(record, attr)
+
+    return property(fget, fset)
+
+
+def encodedLength(string):
+    # Names are nearly always ASCII, whose UTF-8 length is the string length
+    return len(string) if string.isascii() else len(string.encode('utf-8'))
+
+
+def writeString(buffer, pos, string):
+    # Relies on buffer being zero-filled for the NUL terminator
+    string = string.encode('utf-8')
+    end = pos + len(string)
+    buffer[pos:end] = string
+
+    return end + 1
+
+
+def swapFields(codecs, buffer, pos, endianness):
+    """
+    Repack the struct at pos from endianness into the other byte order in
+    place and return its fields
+    """
+    fields = codecs[endianness].unpack_from(buffer, pos)
+    codecs['>' if endianness == '<' else '<'].pack_into(buffer, pos, *fields)
+
+    return fields
+
+
+integerToken = re.compile(r'[+-]?(?:0[xX][0-9A-Fa-f]+|\d+i?)$')
+wordCodec = struct.Struct('=I')
+floatCodec = struct.Struct('=f')
+specialTopByte = re.compile(rb'[\x00\x7f\x80\xff]')
+
+# Smallest and largest finite float32 that are not denormals
+floatMin = 1.1754943508222875e-38
+floatMax = 3.4028234663852886e+38
+
+
+def getIntegerWords(floats):
+    """
+    Indices of the words of floats that only make sense as integers: small
+    integers read as denormals and negative ones as NaNs
+    """
+    # Those have an exponent of all zeros or all ones, so the top byte of
+    # their word is one of four values
+    topBytes = floats.tobytes()[3 if nativeEndianness == '<' else 0::4]
+    candidates = [match.start() for match in specialTopByte.finditer(topBytes)]
+
+    return [i for i in candidates if not (floats[i] == 0 or floatMin <= abs(floats[i]) <= floatMax)]
+
+
+def formatDefaultValue(data, endianness='<'):
+    """
+    Text of a default value: its 32-bit words separated by commas, as
+    floats (always with a decimal point or exponent) or, for words that
+    only make sense as integers, as integers with an i suffix. Values that
+    are not made of words are shown as a bytes literal.
+
+    This goes through the text of every word, so it is several times
+    slower than repr() of the bytes; use getDefaultArray() for bulk work.
+    """
+    if len(data) % 4:
+        return repr(bytes(data))
+
+    floats = array.array('f', data)
+    if endianness != nativeEndianness:
+        floats.byteswap()
+
+    # Seven digits are enough for most values, the others get nine
+    texts = ['%.7g' % value for value in floats]
+    roundTrip = array.array('f', map(float, texts))
+    if roundTrip != floats:
+        for i in [i for i, (value, parsed) in enumerate(zip(floats, roundTrip)) if value != parsed]:
+            texts[i] = '%.9g' % floats[i]
+
+    texts = [text if '.' in text or 'e' in text else text + '.0' for text in texts]
+
+    integerWords = getIntegerWords(floats)
+    if integerWords:
+        integers = array.array('i', floats.tobytes())
+        for i in integerWords:
+            texts[i] = '%di' % integers[i]
+
+    return ', '.join(texts)
+
+
+def parseDefaultValue(text, endianness='<', current=None):
+    """
+    Bytes of a default value in the text form of formatDefaultValue();
+    separators may be commas or spaces. Words are read as floats unless
+    they have an i suffix or are in hex (0x...). If current, the default
+    value the text replaces, is given, plain integers in place of its
+    integer words are read as integers as well. Bytes literals are
+    evaluated as literals only.
+
+    Like formatDefaultValue(), this is several times slower than
+    evaluating a bytes literal; use setDefaultArray() for bulk work.
+    """
+    text = text.strip()
+    if text[:2] in ('b"', "b'"):
+        value = ast.literal_eval(text)
+        if not isinstance(value, bytes):
+            raise ValueError('not a bytes literal: %r' % text)
+
+        return value
+
+    tokens = text.replace(',', ' ').split()
+
+    integerWords = ()
+    if current and not len(current) % 4:
+        floats = array.array('f', current)
+        if endianness != nativeEndianness:
+            floats.byteswap()
+
+        integerWords = getIntegerWords(floats)
+
+    if 'i' not in text and 'x' not in text and 'X' not in text and not integerWords:
+        # Floats too large for 32 bits become infinities here
+        words = array.array('f', map(float, tokens))
+        if float('inf') in words or float('-inf') in words:
+            raise ValueError('value out of range for a 32-bit float')
+
+    else:
+        integerWords = set(integerWords)
+
+        words = array.array('I')
+        for i, token in enumerate(tokens):
+            if integerToken.match(token) and ('i' in token or 'x' in token or 'X' in token or i in integerWords):
+                value = int(token, 16) if 'x' in token or 'X' in token else int(token.rstrip('i'))
+                if not -0x80000000 <= value <= 0xFFFFFFFF:
+                    raise ValueError('value out of range for a 32-bit word: %s' % token)
+
+                words.append(value & 0xFFFFFFFF)
+                continue
+
+            value = float(token)
+            try:
+                if abs(value) == float('inf'):
+                    raise OverflowError
+
+                words.append(wordCodec.unpack(floatCodec.pack(value))[0])
+
+            except OverflowError:
+                raise ValueError('value out of range for a 32-bit float: %s' % token) from None
+
+    if endianness != nativeEndianness:
+        words.byteswap()
+
+    return words.tobytes()
+
+
+class Interner(dict):
+    """
+    Table of canonical str and bytes objects: interner[value] returns the
+    first equal value it was given. Passing one Interner to the loads of
+    several archives makes their duplicate names, values, default values
+    and valid variation flags share one object each.
+    """
+
+    def __missing__(self, value):
+        self[value] = value
+        return value
+
+
+class Codec(dict):
+    """Compiled struct.Struct objects of a record format, keyed by endianness"""
+
+    def __init__(self, format):
+        super().__init__()
+        self.format = format
+
+    def __missing__(self, endianness):
+        codec = self[endianness] = struct.Struct('%s%s' % (endianness, self.format))
+        return codec
+
+
+class Header:
+    format = '5I'
+    codecs = Codec(format)
+
+    def __init__(self, endianness='<'):
+        self.endianness = endianness
+
+        self.name = ''
+        self.size = 0
+
+    def load(self, data, pos=0):
+        # The endianness field is 1 in the archive's own byte order
+        self.endianness = '<' if self.codecs['<'].unpack_from(data, pos)[3] == 1 else '>'
+
+        codec = self.codecs[self.endianness]
+        (magic,
+         version,
+         fileSize,
+         endianness,
+         nameLen) = codec.unpack_from(data, pos)
+
+        assert magic == 0x53484141 and endianness == 1 and version == 11
+
+        size = codec.size
+        pos += size
+
+        self.name = str(data[pos:pos + nameLen], 'utf-8').rstrip('\0')
+        self.size = size + nameLen
+
+    def save(self):
+        codec = self.codecs[self.endianness]
+        name = (self.name + '\0').encode('utf-8')
+        nameLen = len(name)
+
+        self.size = codec.size + nameLen
+
+        return b''.join([
+            codec.pack(
+                0x53484141,  # SHAA
+                11,
+                0,
+                1,
+                nameLen,
+            ),
+            name,
+        ])
+
+    def calcSize(self):
+        self.size = self.codecs[self.endianness].size + len(self.name.encode('utf-8')) + 1
+        return self.size
+
+    def saveInto(self, buffer, pos, fileSize=0):
+        codec = self.codecs[self.endianness]
+        codec.pack_into(
+            buffer, pos,
+            0x53484141,  # SHAA
+            11,
+            fileSize,
+            1,
+            self.size - codec.size,
+        )
+
+        return writeString(buffer, pos + codec.size, self.name)
+
+    @classmethod
+    def swapEndianness(cls, buffer, pos, endianness):
+        nameLen = swapFields(cls.codecs, buffer, pos, endianness)[4]
+        return pos + cls.codecs[endianness].size + nameLen
+
+
+class Diagnostic:
+    """Problem found while validating a shader program"""
+
+    def __init__(self, program, message, variation):
+        self.program = program
+        self.message = message
+        self.variation = variation
+
+    def __str__(self):
+        return '%s: %s' % (self.program, self.message % self.variation)
+
+    def __repr__(self):
+        return 'Diagnostic(%r)' % str(self)
+
+
+class ShaderVariation:
+    __slots__ = ('endianness', 'size', '_name', '_values', '_ID', 'dirty')
+
+    format = '2IiI'
+    codecs = Codec(format)
+
+    name = field('name', indexed=True)
+    values = field('values', mutable=True)
+    ID = field('ID')
+
+    def __init__(self, endianness='<'):
+        self.endianness = endianness
+
+        self.size = 0
+
+        self._name = ''
+        self._values = []
+        self._ID = ''
+
+        self.dirty = True
+
+    def __str__(self):
+        return 'Shader Variation Macro'
+
+    def getName(self):
+        return repr((self.name, self.ID))
+
+    def load(self, data, pos, interner=None):
+        codec = self.codecs[self.endianness]
+        (self.size,
+         nameLen,
+         valueCount,
+         idLen) = codec.unpack_from(data, pos)
+        assert self.size >= codec.size
+        idPos = pos + self.size - idLen
+        pos += codec.size
+
+        self._name = str(data[pos:pos + nameLen], 'utf-8').rstrip('\0')
+        pos += nameLen
+
+        # The values are NUL-terminated and may be preceded by padding NULs,
+        # so split the whole value table at once and drop the empty strings
+        self._values = []
+        if valueCount:
+            self._values.extend(filter(None, str(data[pos:idPos], 'utf-8').split('\0')))
+            assert len(self._values) == valueCount
+
+        self._ID = str(data[idPos:idPos + idLen], 'utf-8').rstrip('\0')
+
+        if interner is not None:
+            self._name = interner[self._name]
+            self._values[:] = [interner[value] for value in self._values]
+            self._ID = interner[self._ID]
+
+        self.dirty = False
+
+    def save(self):
+        codec = self.codecs[self.endianness]
+        for value in self._values:
+            assert value
+
+        name = (self._name + '\0').encode('utf-8')
+        values = b''.join([(value + '\0').encode('utf-8') for value in self._values])
+        ID = (self._ID + '\0').encode('utf-8')
+
+        nameLen = len(name)
+        idLen = len(ID)
+
+        self.size = codec.size + nameLen + len(values) + idLen
+
+        return b''.join([
+            codec.pack(
+                self.size,
+                nameLen,
+                len(self._values),
+                idLen,
+            ),
+            name,
+            values,
+            ID,
+        ])
+
+    def calcSize(self):
+        for value in self._values:
+            assert value
+
+        strings = '\0'.join([self._name, *self._values, self._ID])
+        self.size = self.codecs[self.endianness].size + encodedLength(strings) + 1
+        return self.size
+
+    def saveInto(self, buffer, pos):
+        codec = self.codecs[self.endianness]
+
+        # The strings are encoded together, their NULs delimit them
+        strings = ('\0'.join([self._name, *self._values, self._ID]) + '\0').encode('utf-8')
+        stringsLen = len(strings)
+
+        codec.pack_into(
+            buffer, pos,
+            self.size,
+            strings.index(0) + 1,
+            len(self._values),
+            stringsLen - strings.rindex(0, 0, stringsLen - 1) - 1,
+        )
+
+        pos += codec.size
+        end = pos + stringsLen
+        buffer[pos:end] = strings
+
+        return end
+
+    @classmethod
+    def swapEndianness(cls, buffer, pos, endianness):
+        return pos + swapFields(cls.codecs, buffer, pos, endianness)[0]
+
+
+class ShaderSymbol:
+    __slots__ = ('endianness', 'size', '_param', '_name', '_ID', '_defaultValue', '_validVariations', 'dirty')
+
+    format = 'Ii4I'
+    codecs = Codec(format)
+
+    param = field('param')
+    name = field('name', indexed=True)
+    ID = field('ID')
+    defaultValue = field('defaultValue')
+
+    def __init__(self, endianness='<'):
+        self.endianness = endianness
+
+        self.size = 0
+
+        self._param = 0
+        self._name = ''
+        self._ID = ''
+        self._defaultValue = b''
+        self._validVariations = bytearray()
+
+        self.dirty = True
+
+    def __str__(self):
+        return 'Shader Symbol'
+
+    def getName(self):
+        return repr((self.name, self.ID))
+
+    @property
+    def validVariations(self):
+        """One byte per variation, 1 if the symbol is valid in it"""
+        # Interned loads keep the flags as shared bytes, make a private
+        # copy before handing out something that may be changed in place
+        if isinstance(self._validVariations, bytes):
+            self._validVariations = bytearray(self._validVariations)
+
+        self.dirty = True
+        return self._validVariations
+
+    @validVariations.setter
+    def validVariations(self, validVariations):
+        # Also accepts the lists of bools used before
+        self._validVariations = bytearray(validVariations)
+        self.dirty = True
+
+    def load(self, data, pos, interner=None):
+        codec = self.codecs[self.endianness]
+        (self.size,
+         self._param,
+         nameLen,
+         idLen,
+         defaultValueLen,
+         variationCount) = codec.unpack_from(data, pos)
+        assert self.size >= codec.size
+        pos += codec.size
+
+        self._name = str(data[pos:pos + nameLen], 'utf-8').rstrip('\0')
+        pos += nameLen
+
+        self._ID = str(data[pos:pos + idLen], 'utf-8').rstrip('\0')
+        pos += idLen
+
+        self._defaultValue = bytes(data[pos:pos + defaultValueLen])
+        pos += defaultValueLen
+
+        if interner is None:
+            self._validVariations = bytearray(data[pos:pos + variationCount])
+
+        else:
+            self._name = interner[self._name]
+            self._ID = interner[self._ID]
+            self._defaultValue = interner[self._defaultValue]
+            self._validVariations = interner[bytes(data[pos:pos + variationCount])]
+
+        self.dirty = False
+
+    def save(self):
+        codec = self.codecs[self.endianness]
+        name = (self._name + '\0').encode('utf-8')
+        ID = (self._ID + '\0').encode('utf-8')
+
+        nameLen = len(name)
+        idLen = len(ID)
+        defaultValueLen = len(self._defaultValue)
+        variationCount = len(self._validVariations)
+
+        self.size = codec.size + nameLen + idLen + defaultValueLen + variationCount
+
+        return b''.join([
+            codec.pack(
+                self.size,
+                self._param,
+                nameLen,
+                idLen,
+                defaultValueLen,
+                variationCount,
+            ),
+            name,
+            ID,
+            self._defaultValue,
+            self._validVariations,
+        ])
+
+    def calcSize(self):
+        self.size = (
+            self.codecs[self.endianness].size +
+            encodedLength(self._name + self._ID) + 2 +
+            len(self._defaultValue) +
+            len(self._validVariations)
+        )
+
+        return self.size
+
+    def saveInto(self, buffer, pos):
+        codec = self.codecs[self.endianness]
+
+        # See ShaderVariation.saveInto()
+        strings = (self._name + '\0' + self._ID + '\0').encode('utf-8')
+        nameLen = strings.index(0) + 1
+
+        defaultValueLen = len(self._defaultValue)
+        variationCount = len(self._validVariations)
+
+        codec.pack_into(
+            buffer, pos,
+            self.size,
+            self._param,
+            nameLen,
+            len(strings) - nameLen,
+            defaultValueLen,
+            variationCount,
+        )
+
+        pos += codec.size
+        end = pos + len(strings)
+        buffer[pos:end] = strings
+
+        pos = end
+        end = pos + defaultValueLen
+        buffer[pos:end] = self._defaultValue
+
+        pos = end
+        end = pos + variationCount
+        buffer[pos:end] = self._validVariations
+
+        return end
+
+    @property
+    def defaultValueText(self):
+        """defaultValue as editable text, see formatDefaultValue()"""
+        return formatDefaultValue(self._defaultValue, self.endianness)
+
+    @defaultValueText.setter
+    def defaultValueText(self, text):
+        self.defaultValue = parseDefaultValue(text, self.endianness, self._defaultValue)
+
+    def getDefaultArray(self, typecode='f'):
+        """
+        defaultValue as an array of 32-bit words of typecode ('f', 'i' or
+        'I') in native byte order, which numpy.frombuffer() can wrap
+        """
+        values = array.array(typecode, self._defaultValue)
+        if self.endianness != nativeEndianness:
+            values.byteswap()
+
+        return values
+
+    def setDefaultArray(self, values, typecode='f'):
+        """Set defaultValue from an array, or a sequence of typecode values"""
+        if isinstance(values, array.array):
+            # Copied, as it is byteswapped in place
+            values = array.array(values.typecode, values)
+
+        else:
+            values = array.array(typecode, values)
+
+        assert values.itemsize == 4
+
+        if self.endianness != nativeEndianness:
+            values.byteswap()
+
+        self.defaultValue = values.tobytes()
+
+    @classmethod
+    def swapEndianness(cls, buffer, pos, endianness):
+        (size,
+         param,
+         nameLen,
+         idLen,
+         defaultValueLen,
+         variationCount) = swapFields(cls.codecs, buffer, pos, endianness)
+
+        # Default values are made of 32-bit words
+        if defaultValueLen % 4 == 0:
+            start = pos + cls.codecs[endianness].size + nameLen + idLen
+            end = start + defaultValueLen
+
+            words = array.array('I', buffer[start:end])
+            words.byteswap()
+            buffer[start:end] = words.tobytes()
+
+        return pos + size
+
+
+class ShaderMacro:
+    __slots__ = ('endianness', 'size', '_name', '_value', 'dirty')
+
+    format = '3I'
+    codecs = Codec(format)
+
+    name = field('name', indexed=True)
+    value = field('value')
+
+    def __init__(self, endianness='<'):
+        self.endianness = endianness
+
+        self.size = 0
+
+        self._name = ''
+        self._value = ''
+
+        self.dirty = True
+
+    def __eq__(self, other):
+        if isinstance(other, str):
+            return self.name == other
+
+        return super().__eq__(other)
+
+    def __str__(self):
+        return 'Shader Macro'
+
+    def load(self, data, pos, interner=None):
+        codec = self.codecs[self.endianness]
+        (self.size,
+         nameLen,
+         valueLen) = codec.unpack_from(data, pos)
+        pos += codec.size
+
+        self._name = str(data[pos:pos + nameLen], 'utf-8').rstrip('\0')
+        pos += nameLen
+
+        self._value = str(data[pos:pos + valueLen], 'utf-8').rstrip('\0')
+
+        if interner is not None:
+            self._name = interner[self._name]
+            self._value = interner[self._value]
+
+        self.dirty = False
+
+    def save(self):
+        codec = self.codecs[self.endianness]
+        name = (self._name + '\0').encode('utf-8')
+        value = (self._value + '\0').encode('utf-8')
+
+        nameLen = len(name)
+        valueLen = len(value)
+
+        self.size = codec.size + nameLen + valueLen
+
+        return b''.join([
+            codec.pack(
+                self.size,
+                nameLen,
+                valueLen,
+            ),
+            name,
+            value,
+        ])
+
+    def calcSize(self):
+        self.size = (
+            self.codecs[self.endianness].size +
+            encodedLength(self._name + self._value) + 2
+        )
+
+        return self.size
+
+    def saveInto(self, buffer, pos):
+        codec = self.codecs[self.endianness]
+
+        # See ShaderVariation.saveInto()
+        strings = (self._name + '\0' + self._value + '\0').encode('utf-8')
+        nameLen = strings.index(0) + 1
+
+        codec.pack_into(
+            buffer, pos,
+            self.size,
+            nameLen,
+            len(strings) - nameLen,
+        )
+
+        pos += codec.size
+        end = pos + len(strings)
+        buffer[pos:end] = strings
+
+        return end
+
+    @classmethod
+    def swapEndianness(cls, buffer, pos, endianness):
+        return pos + swapFields(cls.codecs, buffer, pos, endianness)[0]
+
+
+class ShaderProgram:
+    format = '2I3i'
+    codecs = Codec(format)
+
+    name = field('name', indexed=True)
+    vtxShIdx = field('vtxShIdx')
+    frgShIdx = field('frgShIdx')
+    geoShIdx = field('geoShIdx')
+
+    vertexMacros = field('vertexMacros')
+    fragmentMacros = field('fragmentMacros')
+    geometryMacros = field('geometryMacros')
+
+    variations = field('variations')
+    variationDefaults = field('variationDefaults')
+
+    uniformVariables = field('uniformVariables')
+    uniformBlocks = field('uniformBlocks')
+    samplerVariables = field('samplerVariables')
+    attribVariables = field('attribVariables')
+
+    # Item classes of the lists returned by getLists(), in order
+    listClasses = (
+        (ShaderMacro,) * 3 +
+        (ShaderVariation,) * 2 +
+        (ShaderSymbol,) * 4
+    )
+
+    def __init__(self, endianness='<'):
+        self.endianness = endianness
+
+        self.size = 0
+
+        self._name = ''
+        self._vtxShIdx = -1
+        self._frgShIdx = -1
+        self._geoShIdx = -1
+
+        self._vertexMacros = List(self.endianness)
+        self._fragmentMacros = List(self.endianness)
+        self._geometryMacros = List(self.endianness)
+
+        self._variations = List(self.endianness)
+        self._variationDefaults = List(self.endianness)
+
+        self._uniformVariables = List(self.endianness)
+        self._uniformBlocks = List(self.endianness)
+        self._samplerVariables = List(self.endianness)
+        self._attribVariables = List(self.endianness)
+
+        self.dirty = True
+        self._data = None
+        self._offset = 0
+
+    def __eq__(self, other):
+        if isinstance(other, str):
+            return self.name == other
+
+        return super().__eq__(other)
+
+    def __str__(self):
+        return 'Shader Program'
+
+    @classmethod
+    def loadName(cls, data, pos, endianness='<'):
+        codec = cls.codecs[endianness]
+        nameLen = codec.unpack_from(data, pos)[1]
+        pos += codec.size
+
+        return str(data[pos:pos + nameLen], 'utf-8').rstrip('\0')
+
+    def load(self, data, pos, validation='lenient', diagnostics=None, interner=None):
+        self._data = data
+        self._offset = pos
+
+        codec = self.codecs[self.endianness]
+        (self.size,
+         nameLen,
+         self._vtxShIdx,
+         self._frgShIdx,
+         self._geoShIdx) = codec.unpack_from(data, pos)
+        pos += codec.size
+
+        self._name = str(data[pos:pos + nameLen], 'utf-8').rstrip('\0')
+        if interner is not None:
+            self._name = interner[self._name]
+
+        pos += nameLen
+
+        self.vertexMacros.load(data, pos, ShaderMacro, interner=interner)
+        pos += self.vertexMacros.size
+
+        self.fragmentMacros.load(data, pos, ShaderMacro, interner=interner)
+        pos += self.fragmentMacros.size
+
+        self.geometryMacros.load(data, pos, ShaderMacro, interner=interner)
+        pos += self.geometryMacros.size
+
+        self.variations.load(data, pos, ShaderVariation, interner=interner)
+        pos += self.variations.size
+
+        self.variationDefaults.load(data, pos, ShaderVariation, interner=interner)
+        pos += self.variationDefaults.size
+
+        self.uniformVariables.load(data, pos, ShaderSymbol, interner=interner)
+        pos += self.uniformVariables.size
+
+        self.uniformBlocks.load(data, pos, ShaderSymbol, interner=interner)
+        pos += self.uniformBlocks.size
+
+        self.samplerVariables.load(data, pos, ShaderSymbol, interner=interner)
+        pos += self.samplerVariables.size
+
+        self.attribVariables.load(data, pos, ShaderSymbol, interner=interner)
+        pos += self.attribVariables.size
+
+        if validation != 'off':
+            self.validate(validation == 'strict', diagnostics)
+
+        self.dirty = False
+
+    def validate(self, strict=False, diagnostics=None):
+        """
+        Check the variation defaults against the variations and the symbol
+        tables for consistency. Suspicious but loadable variation setups
+        are reported as Diagnostic objects appended to diagnostics, or
+        raise a ValueError if strict is set; broken symbols always fail.
+        """
+        def report(message, variation):
+            diagnostic = Diagnostic(self.name, message, variation.getName())
+            if strict:
+                raise ValueError(str(diagnostic))
+
+            if diagnostics is not None:
+                diagnostics.append(diagnostic)
+
+        variations = {(variation.name, variation.ID) for variation in self.variations}
+
+        defaults = {}
+        for default in self.variationDefaults:
+            defaults.setdefault((default.name, default.ID), default)
+
+        for default in self.variationDefaults:
+            if (default.name, default.ID) in variations:
+                assert len(default._values) <= 1
+
+            else:
+                report("Variation default %s does not match any variation", default)
+
+        for variation in self.variations:
+            default = defaults.get((variation.name, variation.ID))
+            if default is not None:
+                if variation._values and not default._values:
+                    report("Variation %s does not have a default (1)", variation)
+
+            elif not variation._values:
+                report("Variation %s does not have a default (2)", variation)
+
+            elif len(variation._values) == 1:
+                report("Variation %s does not have a default (3)", variation)
+
+            else:
+                report("Variation %s does not have a default (4)", variation)
+
+        for sym in self.uniformBlocks:
+            assert sym.param == len(sym.defaultValue)
+
+        for sym in self.samplerVariables:
+            assert not sym.defaultValue
+            assert sym.param == -1
+
+        for sym in self.attribVariables:
+            assert not sym.defaultValue
+            assert sym.param == -1
+
+    def isDirty(self):
+        """Whether the program may differ from the bytes it was loaded from"""
+        if self.dirty or self._data is None:
+            return True
+
+        for itemList in self.getLists():
+            if itemList.dirty:
+                return True
+
+            for item in itemList:
+                if item.dirty:
+                    return True
+
+        return False
+
+    def getRawData(self):
+        """Bytes of an unmodified loaded program, else None"""
+        if self.isDirty():
+            return None
+
+        return self._data[self._offset:self._offset + self.size]
+
+    def save(self):
+        data = self.getRawData()
+        if data is not None:
+            return bytes(data)
+
+        codec = self.codecs[self.endianness]
+        name = (self.name + '\0').encode('utf-8')
+        nameLen = len(name)
+
+        vertexMacros = self.vertexMacros.save()
+        fragmentMacros = self.fragmentMacros.save()
+        geometryMacros = self.geometryMacros.save()
+
+        variations = self.variations.save()
+        variationDefaults = self.variationDefaults.save()
+
+        uniformVariables = self.uniformVariables.save()
+        uniformBlocks = self.uniformBlocks.save()
+        samplerVariables = self.samplerVariables.save()
+        attribVariables = self.attribVariables.save()
+
+        self.size = (
+            codec.size +
+            nameLen +
+            self.vertexMacros.size +
+            self.fragmentMacros.size +
+            self.geometryMacros.size +
+            self.variations.size +
+            self.variationDefaults.size +
+            self.uniformVariables.size +
+            self.uniformBlocks.size +
+            self.samplerVariables.size +
+            self.attribVariables.size
+        )
+
+        return b''.join([
+            codec.pack(
+                self.size,
+                nameLen,
+                self.vtxShIdx,
+                self.frgShIdx,
+                self.geoShIdx,
+            ),
+            name,
+            vertexMacros,
+            fragmentMacros,
+            geometryMacros,
+            variations,
+            variationDefaults,
+            uniformVariables,
+            uniformBlocks,
+            samplerVariables,
+            attribVariables,
+        ])
+
+    def getLists(self):
+        return (
+            self.vertexMacros,
+            self.fragmentMacros,
+            self.geometryMacros,
+            self.variations,
+            self.variationDefaults,
+            self.uniformVariables,
+            self.uniformBlocks,
+            self.samplerVariables,
+            self.attribVariables,
+        )
+
+    def calcSize(self):
+        if not self.isDirty():
+            return self.size
+
+        self.size = (
+            self.codecs[self.endianness].size +
+            encodedLength(self.name) + 1 +
+            sum([itemList.calcSize() for itemList in self.getLists()])
+        )
+
+        return self.size
+
+    def saveInto(self, buffer, pos):
+        data = self.getRawData()
+        if data is not None:
+            end = pos + self.size
+            buffer[pos:end] = data
+
+            return end
+
+        codec = self.codecs[self.endianness]
+        namePos = pos + codec.size
+        end = writeString(buffer, namePos, self.name)
+
+        codec.pack_into(
+            buffer, pos,
+            self.size,
+            end - namePos,
+            self.vtxShIdx,
+            self.frgShIdx,
+            self.geoShIdx,
+        )
+
+        for itemList in self.getLists():
+            end = itemList.saveInto(buffer, end)
+
+        return end
+
+    @classmethod
+    def swapEndianness(cls, buffer, pos, endianness):
+        (size,
+         nameLen,
+         vtxShIdx,
+         frgShIdx,
+         geoShIdx) = swapFields(cls.codecs, buffer, pos, endianness)
+        end = pos + size
+        pos += cls.codecs[endianness].size + nameLen
+
+        for ItemClass in cls.listClasses:
+            pos = List.swapEndianness(buffer, pos, endianness, ItemClass)
+
+        assert pos == end
+        return end
+
+
+class ShaderSource:
+    format = '4I'
+    codecs = Codec(format)
+
+    def __init__(self, endianness='<'):
+        self.endianness = endianness
+
+        self.size = 0
+
+        self.name = ''
+        self.code = ''
+
+        self._codeLen = 0
+        self._codeLen2 = 0
+
+    def __str__(self):
+        return 'Shader Code'
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        self._name = name
+        List.renames += 1
+
+    def __eq__(self, other):
+        if isinstance(other, str):
+            return self.name == other
+
+        return super().__eq__(other)
+
+    @property
+    def code(self):
+        if self._code is None:
+            self._code = str(self.getRawCode(), 'shift-jis')
+
+        return self._code
+
+    @code.setter
+    def code(self, code):
+        self._code = code
+        self._data = None
+
+    def getRawCode(self):
+        """Shift-JIS bytes of a loaded source whose code was not assigned, else None"""
+        if self._data is None:
+            return None
+
+        return self._data[self._codeOffset:self._codeOffset + self._codeLen]
+
+    def load(self, data, pos, lazy=False, interner=None):
+        codec = self.codecs[self.endianness]
+        (self.size,
+         nameLen,
+         codeLen,
+         codeLen2) = codec.unpack_from(data, pos)
+        pos += codec.size
+
+        self.name = str(data[pos:pos + nameLen], 'utf-8').rstrip('\0')
+        pos += nameLen
+
+        # Remember where the code is, so that it is saved by copying it until
+        # code is assigned. Lazily loaded code is decoded on first access
+        self._data = data
+        self._codeOffset = pos
+
+        if lazy:
+            self._code = None
+
+        else:
+            self._code = str(data[pos:pos + codeLen], 'shift-jis')
+
+        if interner is not None:
+            self.name = interner[self.name]
+            if not lazy:
+                self._code = interner[self._code]
+
+        pos += codeLen
+
+        self._codeLen = codeLen
+        self._codeLen2 = codeLen2
+
+    def save(self):
+        codec = self.codecs[self.endianness]
+        name = (self.name + '\0').encode('utf-8')
+
+        code = self.getRawCode()
+        if code is None:
+            code = self.code.encode('shift-jis')
+
+        nameLen = len(name)
+        codeLen = len(code)
+        codeLen2 = self._codeLen2 if codeLen == self._codeLen else codeLen
+
+        self.size = codec.size + nameLen + codeLen
+
+        return b''.join([
+            codec.pack(
+                self.size,
+                nameLen,
+                codeLen,
+                codeLen2
+            ),
+            name,
+            code,
+        ])
+
+    def calcSize(self):
+        code = self.getRawCode()
+        if code is None:
+            # Keep the encoded code around for saveInto()
+            code = self._encodedCode = self.code.encode('shift-jis')
+
+        self.size = self.codecs[self.endianness].size + len(self.name.encode('utf-8')) + 1 + len(code)
+        return self.size
+
+    def saveInto(self, buffer, pos):
+        codec = self.codecs[self.endianness]
+
+        code = self.getRawCode()
+        if code is None:
+            code = self._encodedCode
+            self._encodedCode = None
+
+        nameLen = len(self.name.encode('utf-8')) + 1
+        codeLen = len(code)
+        codeLen2 = self._codeLen2 if codeLen == self._codeLen else codeLen
+
+        codec.pack_into(
+            buffer, pos,
+            self.size,
+            nameLen,
+            codeLen,
+            codeLen2,
+        )
+
+        pos = writeString(buffer, pos + codec.size, self.name)
+        buffer[pos:pos + codeLen] = code
+
+        return pos + codeLen
+
+    @classmethod
+    def swapEndianness(cls, buffer, pos, endianness):
+        # The code is Shift-JIS text, only the record header needs swapping
+        return pos + swapFields(cls.codecs, buffer, pos, endianness)[0]
+
+    def export(self, path):
+        with open(os.path.join(path, self.name), 'wb+') as out:
+            out.write(self.code.encode('utf-8'))
+
+
+class List:
+    """
+    List of records. Lookups by name go through a name -> index dict that
+    is kept up to date by append(), extend() and pop(), and rebuilt on the
+    next lookup once any record was renamed. These methods also mark the
+    list as dirty, changing items does not.
+    """
+
+    format = '2I'
+    codecs = Codec(format)
+
+    # Count of name assignments to records of any list, name indexes built
+    # before the latest one are stale
+    renames = 0
+
+    def __init__(self, endianness='<'):
+        self.endianness = endianness
+
+        self.size = 0
+
+        self.items = []
+
+        self.dirty = True
+        self._nameIndex = None
+        self._nameIndexRenames = 0
+
+    def __getitem__(self, i):
+        return self.items.__getitem__(i)
+
+    def __iter__(self):
+        return self.items.__iter__()
+
+    def __contains__(self, item):
+        if isinstance(item, str):
+            return item in self.getNameIndex()
+
+        return item in self.items
+
+    def append(self, item):
+        self.items.append(item)
+        self.dirty = True
+
+        if self._nameIndex is not None:
+            self._nameIndex.setdefault(item.name, len(self.items) - 1)
+
+    def extend(self, itemList):
+        for item in itemList:
+            self.append(item)
+
+    def index(self, item):
+        if isinstance(item, str):
+            return self.getNameIndex().get(item, -1)
+
+        try:
+            return self.items.index(item)
+
+        except ValueError:
+            return -1
+
+    def get(self, name, default=None):
+        index = self.getNameIndex().get(name)
+        if index is None:
+            return default
+
+        return self[index]
+
+    def pop(self, index):
+        # Every index after the popped item shifts, rebuild on next lookup
+        self._nameIndex = None
+        self.dirty = True
+
+        return self.items.pop(index)
+
+    def __len__(self):
+        return self.items.__len__()
+
+    def getName(self, i):
+        return self.items[i].name
+
+    def getNames(self):
+        return [self.getName(i) for i in range(len(self))]
+
+    def getNameIndex(self):
+        if self._nameIndex is None or self._nameIndexRenames != List.renames:
+            self._nameIndex = nameIndex = {}
+            self._nameIndexRenames = List.renames
+            for i, name in enumerate(self.getNames()):
+                nameIndex.setdefault(name, i)
+
+        return self._nameIndex
+
+    def load(self, data, pos, ItemClass=None, **kwargs):
+        codec = self.codecs[self.endianness]
+        (self.size,
+         count) = codec.unpack_from(data, pos)
+        pos += codec.size
+
+        if ItemClass:
+            for _ in range(count):
+                item = ItemClass(self.endianness)
+                item.load(data, pos, **kwargs)
+                pos += item.size
+
+                self.append(item)
+
+        self.dirty = False
+
+    def save(self):
+        codec = self.codecs[self.endianness]
+        parts = [item.save() for item in self]
+        self.size = codec.size + sum(map(len, parts))
+
+        return b''.join([
+            codec.pack(
+                self.size,
+                len(self),
+            ),
+            *parts,
+        ])
+
+    def calcSize(self):
+        self.size = self.codecs[self.endianness].size + sum([item.calcSize() for item in self])
+        return self.size
+
+    def saveInto(self, buffer, pos):
+        codec = self.codecs[self.endianness]
+        codec.pack_into(buffer, pos, self.size, len(self))
+        pos += codec.size
+
+        for item in self:
+            pos = item.saveInto(buffer, pos)
+
+        return pos
+
+    def writeInto(self, out):
+        codec = self.codecs[self.endianness]
+        out.write(codec.pack(self.size, len(self)))
+
+        for item in self:
+            outBuffer = bytearray(item.size)
+            item.saveInto(outBuffer, 0)
+            out.write(outBuffer)
+
+    @classmethod
+    def swapEndianness(cls, buffer, pos, endianness, ItemClass):
+        """
+        Convert a serialized list and its items from endianness into the
+        other byte order in place, without decoding any strings
+        """
+        size, count = swapFields(cls.codecs, buffer, pos, endianness)
+        end = pos + size
+        pos += cls.codecs[endianness].size
+
+        for _ in range(count):
+            pos = ItemClass.swapEndianness(buffer, pos, endianness)
+
+        assert pos == end
+        return end
+
+
+class LazyList(List):
+    """
+    List that only indexes its items on load and parses each of them the
+    first time it is accessed. ItemClass must provide a loadName()
+    classmethod so that item names are available without parsing. Items
+    that were never accessed are saved by copying their original bytes.
+    """
+
+    sizeCodecs = Codec('I')
+
+    def __init__(self, endianness='<'):
+        super().__init__(endianness)
+
+        self._data = None
+        self._ItemClass = None
+        self._kwargs = {}
+
+        self._offsets = []
+        self._sizes = []
+        self._names = []
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+
+        item = self.items[i]
+        if item is None:
+            item = self._ItemClass(self.endianness)
+            item.load(self._data, self._offsets[i], **self._kwargs)
+            self.items[i] = item
+
+        return item
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, item):
+        self._offsets.append(None)
+        self._sizes.append(None)
+        self._names.append(None)
+        super().append(item)
+
+    def pop(self, index):
+        # Items never accessed are not parsed, so that one that fails to
+        # parse can still be removed; None is returned for those
+        item = super().pop(index)
+        self._offsets.pop(index)
+        self._sizes.pop(index)
+        self._names.pop(index)
+
+        return item
+
+    def getName(self, i):
+        item = self.items[i]
+        if item is None:
+            return self._names[i]
+
+        return item.name
+
+    def isLoaded(self, i):
+        return self.items[i] is not None
+
+    def getRawData(self, i):
+        """Bytes item i was loaded from if it was never accessed, else None"""
+        if self.items[i] is not None:
+            return None
+
+        offset = self._offsets[i]
+        return self._data[offset:offset + self._sizes[i]]
+
+    def getIndex(self):
+        """Offsets, sizes and names of the items, see loadIndex()"""
+        return list(self._offsets), list(self._sizes), list(self._names)
+
+    def loadIndex(self, data, size, offsets, sizes, names, ItemClass, **kwargs):
+        """Set up the list from an index saved by getIndex() instead of data"""
+        self.size = size
+
+        self._data = data
+        self._ItemClass = ItemClass
+        self._kwargs = kwargs
+
+        self.items = [None] * len(offsets)
+        self._offsets = list(offsets)
+        self._sizes = list(sizes)
+        self._names = list(names)
+
+        self.dirty = False
+
+    def load(self, data, pos, ItemClass=None, **kwargs):
+        codec = self.codecs[self.endianness]
+        (self.size,
+         count) = codec.unpack_from(data, pos)
+        pos += codec.size
+
+        if ItemClass:
+            self._data = data
+            self._ItemClass = ItemClass
+            self._kwargs = kwargs
+
+            sizeCodec = self.sizeCodecs[self.endianness]
+            for _ in range(count):
+                size = sizeCodec.unpack_from(data, pos)[0]
+
+                self.items.append(None)
+                self._offsets.append(pos)
+                self._sizes.append(size)
+                self._names.append(ItemClass.loadName(data, pos, self.endianness))
+
+                pos += size
+
+        self.dirty = False
+
+    def calcSize(self):
+        self.size = self.codecs[self.endianness].size
+        for item, size in zip(self.items, self._sizes):
+            self.size += size if item is None else item.calcSize()
+
+        return self.size
+
+    def saveInto(self, buffer, pos):
+        codec = self.codecs[self.endianness]
+        codec.pack_into(buffer, pos, self.size, len(self))
+        pos += codec.size
+
+        for item, offset, size in zip(self.items, self._offsets, self._sizes):
+            if item is None:
+                buffer[pos:pos + size] = self._data[offset:offset + size]
+                pos += size
+
+            else:
+                pos = item.saveInto(buffer, pos)
+
+        return pos
+
+    def save(self):
+        codec = self.codecs[self.endianness]
+
+        # Items never accessed that were loaded next to each other are
+        # copied in one slice
+        parts = []
+        runStart = runEnd = None
+        for item, offset, size in zip(self.items, self._offsets, self._sizes):
+            if item is None and offset == runEnd:
+                runEnd += size
+                continue
+
+            if runStart is not None:
+                parts.append(self._data[runStart:runEnd])
+                runStart = runEnd = None
+
+            if item is None:
+                runStart = offset
+                runEnd = offset + size
+
+            else:
+                parts.append(item.save())
+
+        if runStart is not None:
+            parts.append(self._data[runStart:runEnd])
+
+        self.size = codec.size + sum(map(len, parts))
+
+        return b''.join([
+            codec.pack(
+                self.size,
+                len(self),
+            ),
+            *parts,
+        ])
+
+    def writeInto(self, out):
+        codec = self.codecs[self.endianness]
+        out.write(codec.pack(self.size, len(self)))
+
+        for item, offset, size in zip(self.items, self._offsets, self._sizes):
+            if item is None:
+                out.write(self._data[offset:offset + size])
+
+            else:
+                outBuffer = bytearray(item.size)
+                item.saveInto(outBuffer, 0)
+                out.write(outBuffer)
+
+
+class Archive:
+    """
+    A shader archive: its header, program list and source list. load(),
+    save() and writeInto() hold the archive's lock, so one archive can be
+    shared between threads, and separate archives never share any state.
+    Records themselves are not locked; don't edit an archive while another
+    thread saves it.
+
+    diagnostics collects the Diagnostic objects of lenient validation (see
+    load()), also of lazily loaded programs as they are parsed.
+    """
+
+    def __init__(self, name='', endianness='<'):
+        self.header = Header(endianness)
+        self.header.name = name
+
+        self.progList = List(endianness)
+        self.codeList = List(endianness)
+
+        self.diagnostics = []
+
+        self.lock = threading.RLock()
+
+    @property
+    def name(self):
+        return self.header.name
+
+    @name.setter
+    def name(self, name):
+        self.header.name = name
+
+    @property
+    def endianness(self):
+        return self.header.endianness
+
+    def load(self, inb, pos=0, lazy=False, validation='lenient', diagnostics=None, interner=None):
+        """
+        Load the archive from inb, in the byte order given by its header.
+        With lazy=True, programs are only indexed and parsed on first access
+        (see LazyList) and source code is not decoded until ShaderSource.code
+        is first accessed. Either way, unmodified programs and sources whose
+        code is never assigned are saved back byte-for-byte from inb, which
+        is kept alive for as long as such records exist.
+
+        validation is 'strict', 'lenient' or 'off', see
+        ShaderProgram.validate(); in lenient mode, diagnostics are appended
+        to a new self.diagnostics list, or to the diagnostics list if one is
+        given, which then becomes self.diagnostics. Lazily loaded programs
+        are validated when they are parsed.
+
+        If an Interner is given, equal strings and bytes of the loaded
+        records share one object, also with other archives loaded with the
+        same interner.
+        """
+        if diagnostics is None:
+            diagnostics = []
+
+        header = Header()
+        header.load(inb, pos)
+
+        endianness = header.endianness
+        pos += header.size
+
+        progList = LazyList(endianness) if lazy else List(endianness)
+        progList.load(inb, pos, ShaderProgram, validation=validation, diagnostics=diagnostics, interner=interner)
+
+        pos += progList.size
+
+        codeList = List(endianness)
+        codeList.load(inb, pos, ShaderSource, lazy=lazy, interner=interner)
+
+        with self.lock:
+            self.header = header
+            self.progList = progList
+            self.codeList = codeList
+            self.diagnostics = diagnostics
+
+    def getIndex(self):
+        """
+        Positions of the programs and sources of a lazily loaded archive,
+        from which loadIndex() can set it up again without parsing
+        """
+        assert isinstance(self.progList, LazyList)
+
+        offsets, sizes, names = self.progList.getIndex()
+        return self.header.size, self.progList.size, offsets, sizes, names
+
+    def loadIndex(self, inb, index, validation='lenient', diagnostics=None, interner=None):
+        """Lazily load the archive in inb using an index from getIndex()"""
+        if diagnostics is None:
+            diagnostics = []
+
+        headerSize, progListSize, offsets, sizes, names = index
+
+        header = Header()
+        header.load(inb)
+        assert header.size == headerSize
+
+        endianness = header.endianness
+
+        progList = LazyList(endianness)
+        progList.loadIndex(inb, progListSize, offsets, sizes, names, ShaderProgram,
+                           validation=validation, diagnostics=diagnostics, interner=interner)
+
+        codeList = List(endianness)
+        codeList.load(inb, headerSize + progListSize, ShaderSource, lazy=True, interner=interner)
+
+        with self.lock:
+            self.header = header
+            self.progList = progList
+            self.codeList = codeList
+            self.diagnostics = diagnostics
+
+    def loadPath(self, path, mmap=True, lazy=True, **kwargs):
+        """
+        Load the archive at path. By default the file is memory-mapped and
+        parsed through memoryview slices, so fixed-width fields and source
+        code are never copied, and sources are loaded lazily (see load()).
+        The mapping stays alive for as long as loaded records refer to it, so
+        the file must not be overwritten in place while they are in use.
+        Other keyword arguments are passed on to load().
+        """
+        with open(path, 'rb') as inf:
+            if not mmap:
+                return self.load(inf.read(), lazy=lazy, **kwargs)
+
+            data = memoryview(mmapModule.mmap(inf.fileno(), 0, access=mmapModule.ACCESS_READ))
+
+        self.load(data, lazy=lazy, **kwargs)
+
+    def calcSize(self):
+        return self.header.calcSize() + self.progList.calcSize() + self.codeList.calcSize()
+
+    def save(self, endianness=None):
+        """
+        Serialize the archive into a bytearray. Every record is built with
+        its save() and joined with the others of its list, which is the
+        fastest way in Python; writeInto() packs records in place instead,
+        to keep memory use low. Programs that were not modified since they
+        were loaded (see ShaderProgram.isDirty()) are copied from the loaded
+        data as is.
+
+        If endianness ('<' or '>') differs from the archive's, the result is
+        converted to that byte order by swapping the integer fields of the
+        serialized records (see swapEndianness()); the archive itself keeps
+        its byte order.
+        """
+        with self.lock:
+            outBuffer = bytearray().join([
+                self.header.save(),
+                self.progList.save(),
+                self.codeList.save(),
+            ])
+
+            # The file size is only known now
+            self.header.saveInto(outBuffer, 0, len(outBuffer))
+
+        if endianness is not None and endianness != self.endianness:
+            swapEndianness(outBuffer, self.endianness)
+
+        return outBuffer
+
+    def writeInto(self, out, endianness=None):
+        """
+        Serialize the archive straight into the writable file object out, one
+        program or source at a time, and return the number of bytes written.
+        Converting to another byte order goes through save().
+        """
+        if endianness is not None and endianness != self.endianness:
+            outBuffer = self.save(endianness)
+            out.write(outBuffer)
+
+            return len(outBuffer)
+
+        with self.lock:
+            fileSize = self.calcSize()
+
+            outBuffer = bytearray(self.header.size)
+            self.header.saveInto(outBuffer, 0, fileSize)
+            out.write(outBuffer)
+
+            self.progList.writeInto(out)
+            self.codeList.writeInto(out)
+
+        return fileSize
+
+    def savePath(self, path, endianness=None):
+        """
+        Write the archive to path through writeInto(). It is written to a
+        temporary file next to path first and moved over path once complete,
+        so a failed save leaves path as it was, and an archive can be saved
+        over the file it was memory-mapped from.
+        """
+        tempPath = '%s.%d.tmp' % (path, os.getpid())
+
+        try:
+            with open(tempPath, 'wb') as out:
+                self.writeInto(out, endianness)
+
+            os.replace(tempPath, path)
+
+        except BaseException:
+            try:
+                os.remove(tempPath)
+
+            except OSError:
+                pass
+
+            raise
+
+
+def swapEndianness(buffer, endianness):
+    """
+    Convert the serialized archive in buffer from endianness into the other
+    byte order in place. Only the integer fields and symbol default values
+    are swapped; names and source code are copied as they are.
+    """
+    pos = Header.swapEndianness(buffer, 0, endianness)
+    pos = List.swapEndianness(buffer, pos, endianness, ShaderProgram)
+    List.swapEndianness(buffer, pos, endianness, ShaderSource)
+
+
+def load(inb, pos=0, **kwargs):
+    """Load an archive from inb and return it, see Archive.load()"""
+    archive = Archive()
+    archive.load(inb, pos, **kwargs)
+
+    return archive
+
+
+def load_path(path, **kwargs):
+    """Load the archive at path and return it, see Archive.loadPath()"""
+    archive = Archive()
+    archive.loadPath(path, **kwargs)
+
+    return archive
+
+
+def save(archive, endianness=None):
+    return archive.save(endianness)
+
+
+def write_into(out, archive, endianness=None):
+    return archive.writeInto(out, endianness)
+
+
+def save_path(path, archive, endianness=None):
+    archive.savePath(path, endianness)
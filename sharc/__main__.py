@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import os.path
+import sys
+
+import sharc
+import sharc.dedup
+
+
+def getOutputPath(path, output):
+    if output is None:
+        return path
+
+    return os.path.join(output, os.path.basename(path))
+
+
+def listArchive(args, path):
+    archive = sharc.load_path(path)
+
+    print("Shader Program")
+    for name in archive.progList.getNames():
+        print("  %s" % name)
+
+    print("Shader Source")
+    for name in archive.codeList.getNames():
+        print("  %s" % name)
+
+
+def infoArchive(args, path):
+    # Programs are only validated when parsed, so parse them all if needed
+    archive = sharc.load_path(path, lazy=args.validation == 'off', validation=args.validation)
+
+    print("Name: %s" % archive.name)
+    print("Byte order: %s" % ('little' if archive.endianness == '<' else 'big'))
+    print("Size: %d" % os.path.getsize(path))
+    print("Programs: %d" % len(archive.progList))
+    print("Sources: %d" % len(archive.codeList))
+
+    for diagnostic in archive.diagnostics:
+        print("  %s" % diagnostic)
+
+
+def extractSources(args, path):
+    codeList = sharc.load_path(path).codeList
+
+    outPath = os.path.join(args.output, os.path.splitext(os.path.basename(path))[0])
+    os.makedirs(outPath, exist_ok=True)
+
+    for code in codeList:
+        code.export(outPath)
+
+    print("Extracted %d sources to %s" % (len(codeList), outPath))
+
+
+def replaceSource(args, path):
+    # Read the file into memory as it may be overwritten
+    archive = sharc.load_path(path, mmap=False)
+
+    code = archive.codeList.get(args.name)
+    if code is None:
+        raise ValueError("no shader source named %s" % args.name)
+
+    with open(args.file, encoding='utf-8') as inf:
+        code.code = inf.read()
+
+    archive.savePath(getOutputPath(path, args.output))
+
+
+def setMacro(args, path):
+    archive = sharc.load_path(path, mmap=False)
+    progList = archive.progList
+
+    if args.program:
+        programs = []
+        for name in args.program:
+            program = progList.get(name)
+            if program is None:
+                raise ValueError("no shader program named %s" % name)
+
+            programs.append(program)
+
+    else:
+        programs = progList
+
+    for program in programs:
+        macros = getattr(program, '%sMacros' % args.stage)
+
+        macro = macros.get(args.name)
+        if macro is None:
+            macro = sharc.ShaderMacro(macros.endianness)
+            macro.name = args.name
+            macros.append(macro)
+
+        macro.value = args.value
+
+    archive.savePath(getOutputPath(path, args.output))
+
+
+def repackArchive(args, path):
+    archive = sharc.load_path(path, mmap=False)
+
+    # Re-encode every program instead of copying the loaded bytes
+    for program in archive.progList:
+        program.dirty = True
+
+    archive.savePath(getOutputPath(path, args.output))
+
+
+def convertArchive(args, path):
+    archive = sharc.load_path(path, mmap=False)
+    archive.savePath(getOutputPath(path, args.output), '<' if args.to == 'little' else '>')
+
+
+def dedupArchive(args, path):
+    args.report.add(path, sharc.load_path(path))
+
+
+def printDedupReport(args):
+    report = args.report
+
+    for size, sources in report.getDuplicates():
+        print("%d bytes, %d copies:" % (size, len(sources)))
+        for path, name in sources:
+            print("  %s: %s" % (path, name))
+
+    print("Duplicate code: %d of %d bytes" % (report.getDuplicateSize(), report.getTotalSize()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m sharc',
+        description="Inspect and edit AGL Resource Shader Archives (.sharc) without the GUI.",
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def addCommand(name, func, help, output=False):
+        subparser = subparsers.add_parser(name, help=help)
+        subparser.add_argument('archives', nargs='+', metavar='ARCHIVE')
+        subparser.set_defaults(func=func)
+
+        if output:
+            subparser.add_argument('-o', '--output', metavar='DIR',
+                                   help="write the archives to DIR instead of overwriting them")
+
+        return subparser
+
+    addCommand('list', listArchive, "list program and source names")
+
+    subparser = addCommand('info', infoArchive, "show archive header and counts")
+    subparser.add_argument('--validation', choices=('strict', 'lenient', 'off'), default='lenient',
+                           help="validate every program (default: lenient)")
+
+    subparser = addCommand('extract-sources', extractSources, "export sources to DIR/<archive name>/")
+    subparser.add_argument('-o', '--output', metavar='DIR', default='.')
+
+    subparser = addCommand('replace-source', replaceSource, "replace the code of a source", output=True)
+    subparser.add_argument('--name', required=True, help="name of the source")
+    subparser.add_argument('--file', required=True, help="UTF-8 text file with the new code")
+
+    subparser = addCommand('set-macro', setMacro, "set (or add) a macro of programs", output=True)
+    subparser.add_argument('--program', action='append',
+                           help="name of the program, can be repeated (default: all programs)")
+    subparser.add_argument('--stage', choices=('vertex', 'fragment', 'geometry'), default='vertex')
+    subparser.add_argument('--name', required=True, help="name of the macro")
+    subparser.add_argument('--value', required=True, help="value of the macro")
+
+    addCommand('repack', repackArchive, "re-encode archives", output=True)
+
+    subparser = addCommand('convert', convertArchive, "convert archives to another byte order", output=True)
+    subparser.add_argument('--to', choices=('little', 'big'), required=True,
+                           help="byte order to convert to (big for Wii U)")
+
+    subparser = addCommand('dedup', dedupArchive, "report sources with identical code across archives")
+    subparser.set_defaults(report=sharc.dedup.Report(), finish=printDedupReport)
+
+    args = parser.parse_args(argv)
+
+    if getattr(args, 'output', None):
+        os.makedirs(args.output, exist_ok=True)
+
+    # Commands that report on all archives at once print at the end
+    finish = getattr(args, 'finish', None)
+
+    status = 0
+    for path in args.archives:
+        if len(args.archives) > 1 and finish is None:
+            print("%s:" % path)
+
+        try:
+            args.func(args, path)
+
+        except Exception as e:
+            print("%s: %s" % (path, e), file=sys.stderr)
+            status = 1
+
+    if finish is not None:
+        finish(args)
+
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
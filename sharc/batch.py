@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import concurrent.futures
+import os
+
+import sharc
+
+
+class Result:
+    """Outcome of processing one archive: fn's return value or the error it raised"""
+
+    def __init__(self, path, value=None, error=None):
+        self.path = path
+        self.value = value
+        self.error = error
+
+    def __repr__(self):
+        if self.error is not None:
+            return 'Result(%r, error=%r)' % (self.path, self.error)
+
+        return 'Result(%r, %r)' % (self.path, self.value)
+
+    def ok(self):
+        return self.error is None
+
+
+def processPath(path, fn, kwargs):
+    try:
+        return Result(path, fn(path, sharc.load_path(path, **kwargs)))
+
+    except Exception as e:
+        return Result(path, error=e)
+
+
+def process(paths, fn, workers=None, progress=None, **kwargs):
+    """
+    Load every archive in paths and call fn(path, archive) on it, spreading
+    the archives over a pool of worker processes (os.cpu_count() by default;
+    workers=1 runs everything in this process). fn must be a
+    module-level function so that it can be sent to the workers, and its
+    return value must be picklable. Other keyword arguments are passed on
+    to sharc.load_path().
+
+    Returns a list of Result objects in the order of paths. If given,
+    progress(done, total, result) is called as each archive finishes.
+    """
+    paths = list(paths)
+    results = [None] * len(paths)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1 or len(paths) <= 1:
+        for i, path in enumerate(paths):
+            results[i] = processPath(path, fn, kwargs)
+            if progress is not None:
+                progress(i + 1, len(paths), results[i])
+
+        return results
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(processPath, path, fn, kwargs): i for i, path in enumerate(paths)}
+
+        for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+
+            except Exception as e:
+                # The worker died or the result could not be sent back
+                results[i] = Result(paths[i], error=e)
+
+            if progress is not None:
+                progress(done, len(paths), results[i])
+
+    return results
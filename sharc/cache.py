@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import array
+import hashlib
+import mmap as mmapModule
+import os
+import pickle
+
+import sharc
+
+
+VERSION = 2
+
+
+def getDefaultPath():
+    cacheHome = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cacheHome, 'sharc')
+
+
+class Cache:
+    """
+    On-disk cache of archive indexes (see Archive.getIndex()), so that an
+    archive that was opened before is set up without parsing it. Entries
+    are keyed by the archive's path and are only used while its size,
+    modification time and content fingerprint are unchanged. The least
+    recently used entries are removed once the cache grows past maxSize
+    bytes.
+
+    The fingerprint hashes the start, middle and end of the file, which is
+    enough to catch files replaced with the same size and time; set
+    fullHash to hash the whole file instead.
+    """
+
+    sampleSize = 64 * 1024
+
+    def __init__(self, path=None, maxSize=64 * 1024 * 1024, fullHash=False):
+        self.path = getDefaultPath() if path is None else path
+        self.maxSize = maxSize
+        self.fullHash = fullHash
+
+    def getEntryPath(self, path):
+        key = hashlib.sha1(os.path.abspath(path).encode('utf-8', 'surrogateescape')).hexdigest()
+        return os.path.join(self.path, key + '.idx')
+
+    def getFingerprint(self, data):
+        if self.fullHash or len(data) <= 3 * self.sampleSize:
+            return hashlib.sha1(data).digest()
+
+        middle = (len(data) - self.sampleSize) // 2
+
+        fingerprint = hashlib.sha1(data[:self.sampleSize])
+        fingerprint.update(data[middle:middle + self.sampleSize])
+        fingerprint.update(data[-self.sampleSize:])
+
+        return fingerprint.digest()
+
+    def load(self, path, mmap=True, **kwargs):
+        """
+        Load the archive at path lazily like sharc.load_path(), from its
+        cached index if there is a valid one, else parsing it and adding its
+        index to the cache. Other keyword arguments are passed on to
+        Archive.load() or Archive.loadIndex().
+        """
+        with open(path, 'rb') as inf:
+            stat = os.fstat(inf.fileno())
+            if mmap:
+                data = memoryview(mmapModule.mmap(inf.fileno(), 0, access=mmapModule.ACCESS_READ))
+
+            else:
+                data = inf.read()
+
+        fingerprint = self.getFingerprint(data)
+        entryPath = self.getEntryPath(path)
+
+        archive = sharc.Archive()
+
+        index = self.getIndex(entryPath, (VERSION, stat.st_size, stat.st_mtime_ns, fingerprint))
+        if index is not None:
+            try:
+                archive.loadIndex(data, index, **kwargs)
+                return archive
+
+            except Exception:
+                # A damaged entry, parse the archive and replace it
+                archive = sharc.Archive()
+
+        archive.load(data, lazy=True, **kwargs)
+
+        # The archive loaded fine, a cache that can't be written to (read
+        # only, full or not a directory) only means parsing it next time
+        try:
+            self.putIndex(entryPath, (VERSION, stat.st_size, stat.st_mtime_ns, fingerprint), archive.getIndex())
+
+        except OSError:
+            pass
+
+        return archive
+
+    def getIndex(self, entryPath, key):
+        # Missing or malformed entries, which can fail to unpickle in many
+        # ways, are misses like stale ones and get replaced after parsing
+        try:
+            with open(entryPath, 'rb') as inf:
+                entryKey, headerSize, progListSize, offsets, sizes, names = pickle.load(inf)
+
+            if entryKey != key or not len(offsets) == len(sizes) == len(names):
+                return None
+
+            # Mark the entry as recently used
+            os.utime(entryPath)
+
+        except Exception:
+            return None
+
+        return headerSize, progListSize, offsets, sizes, names
+
+    def putIndex(self, entryPath, key, index):
+        headerSize, progListSize, offsets, sizes, names = index
+        entry = (
+            key,
+            headerSize,
+            progListSize,
+            array.array('Q', offsets),
+            array.array('Q', sizes),
+            list(names),
+        )
+
+        os.makedirs(self.path, exist_ok=True)
+
+        # Write to a temporary file first so that readers never see a partial entry
+        tempPath = '%s.%d.tmp' % (entryPath, os.getpid())
+        try:
+            with open(tempPath, 'wb') as out:
+                pickle.dump(entry, out, pickle.HIGHEST_PROTOCOL)
+
+            os.replace(tempPath, entryPath)
+
+        except BaseException:
+            try:
+                os.remove(tempPath)
+
+            except OSError:
+                pass
+
+            raise
+
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits maxSize"""
+        entries = []
+        with os.scandir(self.path) as it:
+            for dirEntry in it:
+                if dirEntry.name.endswith('.idx'):
+                    stat = dirEntry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, dirEntry.path))
+
+        totalSize = sum([size for _, size, _ in entries])
+
+        entries.sort()
+        for _, size, entryPath in entries:
+            if totalSize <= self.maxSize:
+                break
+
+            try:
+                os.remove(entryPath)
+
+            except OSError:
+                continue
+
+            totalSize -= size
+
+    def clear(self):
+        maxSize = self.maxSize
+        self.maxSize = 0
+
+        try:
+            if os.path.isdir(self.path):
+                self.evict()
+
+        finally:
+            self.maxSize = maxSize
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from array import array
+
+try:
+    import numpy
+
+except ImportError:
+    numpy = None
+
+import sharc
+
+
+def toNumpy(values):
+    # Wraps the array without copying it
+    return numpy.frombuffer(values, values.typecode)
+
+
+class SymbolTable:
+    """
+    The symbols of every program of an archive, one row per symbol, stored
+    column by column in array objects (which numpy.frombuffer() can wrap
+    without copying). Rows are ordered by program, and programStarts[i] is
+    the first row of program i. Names and IDs are stored as codes into
+    strings.
+
+    If numpy is installed, where(), groupSum() and sumByProgram() use it
+    instead of looping over the rows.
+    """
+
+    UNIFORM_VARIABLE, UNIFORM_BLOCK, SAMPLER_VARIABLE, ATTRIB_VARIABLE = range(4)
+
+    def __init__(self):
+        self.programNames = []
+        self.programStarts = array('I', [0])
+
+        self.program = array('I')
+        self.kind = array('B')
+        self.param = array('i')
+        self.defaultValueLen = array('I')
+        self.name = array('I')
+        self.ID = array('I')
+
+        self.strings = []
+        self._codes = {}
+        self._rawCodes = {}
+
+    def __len__(self):
+        return len(self.program)
+
+    def getCode(self, string):
+        """Code of string in the name and ID columns, -1 if not present"""
+        return self._codes.get(string, -1)
+
+    def getRawCode(self, data):
+        # Strings are looked up by their raw bytes, so each is only decoded once
+        code = self._rawCodes.get(data)
+        if code is None:
+            string = str(data, 'utf-8').rstrip('\0')
+
+            code = self._codes.get(string)
+            if code is None:
+                code = self._codes[string] = len(self.strings)
+                self.strings.append(string)
+
+            self._rawCodes[data] = code
+
+        return code
+
+    @classmethod
+    def fromArchive(cls, archive):
+        # Programs are read from the bytes they were loaded from, only the
+        # symbol record headers are parsed. Modified programs are
+        # serialized on their own first
+        table = cls()
+
+        with archive.lock:
+            progList = archive.progList
+            lazy = isinstance(progList, sharc.LazyList)
+
+            for i in range(len(progList)):
+                data = progList.getRawData(i) if lazy else None
+                if data is None:
+                    data = progList[i].save()
+
+                table.loadProgram(bytes(data), 0, archive.endianness)
+
+        return table
+
+    def load(self, data, endianness='<'):
+        """Add the symbols of the serialized archive in data"""
+        data = bytes(data)
+
+        listCodec = sharc.List.codecs[endianness]
+
+        pos = sharc.Header.codecs[endianness].size + sharc.Header.codecs[endianness].unpack_from(data, 0)[4]
+        programCount = listCodec.unpack_from(data, pos)[1]
+        pos += listCodec.size
+
+        for _ in range(programCount):
+            pos = self.loadProgram(data, pos, endianness)
+
+    def loadProgram(self, data, pos, endianness='<'):
+        """Add the symbols of the serialized program at pos in data (bytes)"""
+        listCodec = sharc.List.codecs[endianness]
+        programCodec = sharc.ShaderProgram.codecs[endianness]
+        symbolCodec = sharc.ShaderSymbol.codecs[endianness]
+        symbolUnpack = symbolCodec.unpack_from
+
+        getRawCode = self.getRawCode
+        programColumn = self.program
+        kindColumn = self.kind
+        paramColumn = self.param
+        defaultValueLenColumn = self.defaultValueLen
+        nameColumn = self.name
+        IDColumn = self.ID
+
+        size, nameLen = programCodec.unpack_from(data, pos)[:2]
+        end = pos + size
+        pos += programCodec.size
+
+        programIdx = len(self.programNames)
+        self.programNames.append(str(data[pos:pos + nameLen], 'utf-8').rstrip('\0'))
+        pos += nameLen
+
+        # Skip the macro and variation lists
+        for _ in range(5):
+            pos += listCodec.unpack_from(data, pos)[0]
+
+        for kind in range(4):
+            count = listCodec.unpack_from(data, pos)[1]
+            pos += listCodec.size
+
+            for _ in range(count):
+                (symSize,
+                 param,
+                 nameLen,
+                 idLen,
+                 defaultValueLen,
+                 variationCount) = symbolUnpack(data, pos)
+
+                namePos = pos + symbolCodec.size
+                idPos = namePos + nameLen
+
+                programColumn.append(programIdx)
+                kindColumn.append(kind)
+                paramColumn.append(param)
+                defaultValueLenColumn.append(defaultValueLen)
+                nameColumn.append(getRawCode(data[namePos:idPos]))
+                IDColumn.append(getRawCode(data[idPos:idPos + idLen]))
+
+                pos += symSize
+
+        assert pos == end
+        self.programStarts.append(len(programColumn))
+
+        return end
+
+    def where(self, column, value, rows=None):
+        """Rows, optionally out of rows, where column holds value"""
+        if numpy is not None:
+            values = toNumpy(column)
+            if rows is None:
+                found = numpy.flatnonzero(values == value)
+
+            else:
+                rows = numpy.asarray(rows, dtype='I')
+                found = rows[values[rows] == value]
+
+            return array('I', found.astype('I').tobytes())
+
+        if rows is not None:
+            return array('I', [row for row in rows if column[row] == value])
+
+        rows = array('I')
+        row = -1
+        try:
+            while True:
+                row = column.index(value, row + 1)
+                rows.append(row)
+
+        except ValueError:
+            pass
+
+        return rows
+
+    def findPrograms(self, name, kind=None):
+        """Names of the programs with a symbol called name"""
+        rows = self.where(self.name, self.getCode(name))
+        if kind is not None:
+            rows = self.where(self.kind, kind, rows)
+
+        if numpy is not None:
+            programs = numpy.unique(toNumpy(self.program)[toNumpy(rows)]).tolist()
+
+        else:
+            programs = sorted(set(self.program[row] for row in rows))
+
+        programNames = self.programNames
+        return [programNames[i] for i in programs]
+
+    def groupSum(self, keyColumn, valueColumn, rows=None):
+        """Dict of the sums of valueColumn for every value of keyColumn"""
+        if numpy is not None:
+            keys = toNumpy(keyColumn)
+            values = toNumpy(valueColumn)
+            if rows is not None:
+                rows = numpy.asarray(rows, dtype='I')
+                keys = keys[rows]
+                values = values[rows]
+
+            if not len(keys):
+                return {}
+
+            # Sum each run of equal keys once sorted, in 64-bit integers
+            order = numpy.argsort(keys, kind='stable')
+            keys = keys[order]
+            starts = numpy.flatnonzero(numpy.concatenate(([True], keys[1:] != keys[:-1])))
+            sums = numpy.add.reduceat(values[order].astype('q'), starts)
+
+            return dict(zip(keys[starts].tolist(), sums.tolist()))
+
+        if rows is None:
+            pairs = zip(keyColumn, valueColumn)
+
+        else:
+            pairs = ((keyColumn[row], valueColumn[row]) for row in rows)
+
+        sums = {}
+        for key, value in pairs:
+            sums[key] = sums.get(key, 0) + value
+
+        return sums
+
+    def sumByProgram(self, column):
+        """Sum of column for each program, one slice of rows per program"""
+        starts = self.programStarts
+        if numpy is not None:
+            # Differences of the running total at the program boundaries
+            totals = numpy.concatenate(([0], numpy.cumsum(toNumpy(column), dtype='q')))
+            starts = toNumpy(starts)
+
+            return array('q', (totals[starts[1:]] - totals[starts[:-1]]).tobytes())
+
+        return array('q', [sum(column[starts[i]:starts[i + 1]]) for i in range(len(self.programNames))])
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+
+
+class Report:
+    """
+    Shader sources of several archives grouped by a hash of their code.
+    Only the hashes are kept, so any number of archives can be added.
+    """
+
+    def __init__(self):
+        self.sources = {}  # digest -> [(archive name, source name), ...]
+        self.sizes = {}  # digest -> code size in bytes
+
+    def add(self, name, archive):
+        for code in archive.codeList:
+            # Lazily loaded code is hashed as is, without decoding it
+            data = code.getRawCode()
+            if data is None:
+                data = code.code.encode('shift-jis')
+
+            digest = hashlib.sha1(data).digest()
+            self.sources.setdefault(digest, []).append((name, code.name))
+            self.sizes[digest] = len(data)
+
+    def getDuplicates(self):
+        """
+        List of (size, sources) for code that appears more than once,
+        largest savings first
+        """
+        duplicates = [(self.sizes[digest], sources) for digest, sources in self.sources.items() if len(sources) > 1]
+        duplicates.sort(key=lambda duplicate: duplicate[0] * (len(duplicate[1]) - 1), reverse=True)
+
+        return duplicates
+
+    def getTotalSize(self):
+        return sum([self.sizes[digest] * len(sources) for digest, sources in self.sources.items()])
+
+    def getDuplicateSize(self):
+        """Bytes of code that would be saved by keeping each source once"""
+        return sum([size * (len(sources) - 1) for size, sources in self.getDuplicates()])